@@ -4,10 +4,13 @@ Gemini Vision API Endpoints
 Provides endpoints for Google Gemini based floor plan analysis.
 """
 from fastapi import APIRouter
+from functools import lru_cache
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
-import base64
+import pybase64 as base64
 
+from app.core.base64_utils import strip_data_uri, detect_image_type
+from app.core.executor import run_in_executor
 from app.services.gemini_vision_service import (
     GeminiVisionService,
     convert_to_homedata_rooms
@@ -16,6 +19,23 @@ from app.services.gemini_vision_service import (
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def get_service() -> GeminiVisionService:
+    """Shared GeminiVisionService instance, so its HTTP client is reused across requests."""
+    return GeminiVisionService()
+
+
+def decode_image_data(image_data: str) -> bytes:
+    """
+    Strictly decode the request's base64 image.
+    
+    Run on the shared CPU-sized executor, so concurrent multi-MB decodes
+    neither block the event loop nor outnumber the cores, while requests
+    already past this step wait on the Gemini API.
+    """
+    return base64.b64decode(image_data, validate=True)
+
+
 class GeminiAnalyzeRequest(BaseModel):
     """Request model for Gemini floor plan analysis"""
     image: str = Field(..., description="Base64 encoded image data")
@@ -43,7 +63,7 @@ class GeminiStatusResponse(BaseModel):
 @router.get("/gemini/status", response_model=GeminiStatusResponse)
 async def check_gemini_status() -> GeminiStatusResponse:
     """Check if Gemini service is properly configured."""
-    service = GeminiVisionService()
+    service = get_service()
     
     if service.is_configured():
         return GeminiStatusResponse(
@@ -62,7 +82,7 @@ async def check_gemini_status() -> GeminiStatusResponse:
 @router.post("/gemini/analyze", response_model=GeminiAnalyzeResponse)
 async def analyze_floor_plan(request: GeminiAnalyzeRequest) -> GeminiAnalyzeResponse:
     """Analyze a floor plan image using Gemini Vision."""
-    service = GeminiVisionService()
+    service = get_service()
     
     if not service.is_configured():
         return GeminiAnalyzeResponse(
@@ -71,19 +91,24 @@ async def analyze_floor_plan(request: GeminiAnalyzeRequest) -> GeminiAnalyzeResp
         )
     
     try:
-        image_data = request.image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        image_data = strip_data_uri(request.image)
         
         try:
-            decoded = base64.b64decode(image_data)
+            service.check_image_size(image_data)
+        except ValueError as e:
+            return GeminiAnalyzeResponse(success=False, error=str(e))
+        
+        try:
+            decoded = await run_in_executor(decode_image_data, image_data)
         except Exception as e:
             return GeminiAnalyzeResponse(
                 success=False,
                 error=f"Invalid base64 image data: {str(e)}"
             )
         
-        result = await service.analyze_floor_plan(image_data)
+        result = await service.analyze_floor_plan(
+            image_data, image_type=detect_image_type(decoded)
+        )
         
         estimated_width = 1000
         estimated_height = 800
@@ -115,7 +140,7 @@ async def analyze_floor_plan_with_dimensions(
     image_height: int = 800
 ) -> GeminiAnalyzeResponse:
     """Analyze a floor plan image with known dimensions."""
-    service = GeminiVisionService()
+    service = get_service()
     
     if not service.is_configured():
         return GeminiAnalyzeResponse(
@@ -124,11 +149,24 @@ async def analyze_floor_plan_with_dimensions(
         )
     
     try:
-        image_data = request.image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        image_data = strip_data_uri(request.image)
+        
+        try:
+            service.check_image_size(image_data)
+        except ValueError as e:
+            return GeminiAnalyzeResponse(success=False, error=str(e))
         
-        result = await service.analyze_floor_plan(image_data)
+        try:
+            decoded = await run_in_executor(decode_image_data, image_data)
+        except Exception as e:
+            return GeminiAnalyzeResponse(
+                success=False,
+                error=f"Invalid base64 image data: {str(e)}"
+            )
+        
+        result = await service.analyze_floor_plan(
+            image_data, image_type=detect_image_type(decoded)
+        )
         
         homedata_rooms = convert_to_homedata_rooms(
             result,
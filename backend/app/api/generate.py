@@ -4,16 +4,24 @@ HomeData Generation API endpoint
 Converts recognition results to homeData.json format for 3D rendering.
 Requirements: 8.1, 8.2, 8.3, 8.4, 8.5
 """
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
-import base64
+from fastapi import APIRouter, HTTPException, File, Form, UploadFile
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Tuple
 import io
+from collections import Counter
+import numpy as np
 
+from PIL import Image
+
+from app.core.executor import run_in_executor
 from app.services.image_service import ImageService, ImageValidationError
-from app.services.preprocessing import preprocess_pil_image
-from app.services.wall_detection import detect_walls
-from app.services.room_detection import detect_rooms, RoomShape
+from app.services.preprocessing import (
+    PreprocessingConfig,
+    PreprocessingResult,
+    preprocess_pil_image
+)
+from app.services.wall_detection import detect_walls, WallDetectionResult
+from app.services.room_detection import detect_rooms, RoomShape, RoomDetectionResult
 
 router = APIRouter()
 
@@ -30,28 +38,64 @@ ROOM_COLORS = {
     'other': '#E5E8E8',
 }
 
+# Default Chinese room names by type
+ROOM_TYPE_NAMES = {
+    'living': '客厅',
+    'dining': '餐厅',
+    'kitchen': '厨房',
+    'bedroom': '卧室',
+    'bathroom': '卫生间',
+    'balcony': '阳台',
+    'study': '书房',
+    'hallway': '走廊',
+}
+
+# Room types assigned by the inference rules below, in rule order
+INFERRED_ROOM_TYPES = ['living', 'dining', 'bathroom', 'hallway', 'bedroom', 'balcony']
+
+
 # Room type inference based on size and position
-def infer_room_type(room_index: int, area: float, aspect_ratio: float, total_rooms: int) -> str:
-    """Infer room type based on characteristics"""
-    # Largest room is usually living room
-    if room_index == 0 and area > 15:
-        return 'living'
-    # Second largest might be dining or another living area
-    if room_index == 1 and area > 12:
-        return 'dining'
-    # Small rooms with aspect ratio close to 1 might be bathroom
-    if area < 6 and 0.6 < aspect_ratio < 1.6:
-        return 'bathroom'
-    # Very small rooms might be storage/closet
-    if area < 4:
-        return 'hallway'
-    # Medium rooms are usually bedrooms
-    if 6 <= area <= 20:
-        return 'bedroom'
-    # Narrow rooms might be hallway or balcony
-    if aspect_ratio < 0.4 or aspect_ratio > 2.5:
-        return 'balcony'
-    return 'bedroom'
+def infer_room_types(areas: np.ndarray, aspect_ratios: np.ndarray) -> List[str]:
+    """
+    Infer room types based on characteristics.
+    
+    Evaluates the rules as a decision table over all rooms at once; the
+    first matching rule wins and unmatched rooms default to bedroom.
+    
+    Args:
+        areas: Room areas in square meters, sorted largest first
+        aspect_ratios: Width to depth ratio of each room
+        
+    Returns:
+        Room type for each room
+    """
+    room_index = np.arange(len(areas))
+    conditions = [
+        # Largest room is usually living room
+        (room_index == 0) & (areas > 15),
+        # Second largest might be dining or another living area
+        (room_index == 1) & (areas > 12),
+        # Small rooms with aspect ratio close to 1 might be bathroom
+        (areas < 6) & (aspect_ratios > 0.6) & (aspect_ratios < 1.6),
+        # Very small rooms might be storage/closet
+        areas < 4,
+        # Medium rooms are usually bedrooms
+        (areas >= 6) & (areas <= 20),
+        # Narrow rooms might be hallway or balcony
+        (aspect_ratios < 0.4) | (aspect_ratios > 2.5),
+    ]
+    return np.select(conditions, INFERRED_ROOM_TYPES, default='bedroom').tolist()
+
+
+def run_recognition_pipeline(
+    pil_image: Image.Image,
+    original_size: Optional[Tuple[int, int]] = None
+) -> Tuple[PreprocessingResult, WallDetectionResult, RoomDetectionResult]:
+    """Run preprocessing, wall detection and room detection on an image."""
+    preprocess_result = preprocess_pil_image(pil_image, original_size)
+    wall_result = detect_walls(preprocess_result.processed)
+    room_result = detect_rooms(wall_result.binary_image)
+    return preprocess_result, wall_result, room_result
 
 
 class RecognizeAndGenerateRequest(BaseModel):
@@ -63,6 +107,13 @@ class RecognizeAndGenerateRequest(BaseModel):
     room_names: Optional[Dict[str, str]] = Field(None, description="Custom room names")
 
 
+class RecognizeAndGenerateMeta(BaseModel):
+    """Options sent as the JSON "meta" form field of the multipart endpoint"""
+    scale: Optional[float] = Field(50.0, description="Pixels per meter")
+    wall_height: Optional[float] = Field(3.0, description="Wall height in meters")
+    room_names: Optional[Dict[str, str]] = Field(None, description="Custom room names")
+
+
 class RoomInfo(BaseModel):
     """Room information in homeData format"""
     id: str
@@ -82,6 +133,132 @@ class HomeDataResponse(BaseModel):
     recognition_info: dict
 
 
+async def generate_home_data(
+    pil_image: Image.Image,
+    scale: Optional[float] = None,
+    wall_height: Optional[float] = None,
+    room_names: Optional[Dict[str, str]] = None,
+    original_size: Optional[Tuple[int, int]] = None
+) -> HomeDataResponse:
+    """
+    Recognize rooms in a validated image and build the homeData response.
+    
+    Shared by the JSON and multipart endpoints. original_size is the size
+    of the upload when pil_image was drafted smaller while decoding.
+    
+    Raises:
+        HTTPException: 400 if no rooms are recognized
+    """
+    # Steps 2-4: Preprocess, detect walls, detect rooms (off the event loop)
+    preprocess_result, wall_result, room_result = await run_in_executor(
+        run_recognition_pipeline, pil_image, original_size
+    )
+    
+    if len(room_result.rooms) == 0:
+        raise HTTPException(
+            status_code=400,
+            detail={"success": False, "error": "无法识别房间，请上传更清晰的户型图"}
+        )
+    
+    # Step 5: Convert to homeData format
+    scale = scale or 50.0  # pixels per meter
+    wall_height = wall_height or 3.0
+    
+    # Calculate image center for coordinate transformation
+    img_width, img_height = room_result.image_size
+    center_x = img_width / 2
+    center_y = img_height / 2
+    
+    # Sort rooms by area (largest first)
+    sorted_rooms = sorted(room_result.rooms, key=lambda r: r.area, reverse=True)
+    
+    # Convert pixel coordinates to meters (centered at origin) for all
+    # rooms at once: columns are center x, center z, width, depth
+    geometry = np.array(
+        [[r.center[0], r.center[1], r.width, r.height] for r in sorted_rooms],
+        dtype=np.float64
+    )
+    geometry[:, :2] -= (center_x, center_y)
+    geometry *= 1.0 / scale
+    rounded = np.round(geometry, 2)
+    
+    # Infer room types
+    room_widths, room_depths = geometry[:, 2], geometry[:, 3]
+    areas_m2 = room_widths * room_depths
+    aspects = np.divide(
+        room_widths, room_depths,
+        out=np.ones_like(room_widths), where=room_depths > 0
+    )
+    room_types = infer_room_types(areas_m2, aspects)
+    
+    # Generate room data
+    rooms_data = []
+    type_counts: Counter = Counter()
+    for i, (room_type, room_rounded) in enumerate(zip(room_types, rounded.tolist())):
+        # Get custom name or generate default
+        room_id = f"room-{i+1}"
+        if room_names and room_id in room_names:
+            room_name = room_names[room_id]
+        else:
+            room_name = ROOM_TYPE_NAMES.get(room_type, f'房间{i+1}')
+            # Add number suffix for duplicate types
+            same_type_count = type_counts[room_type]
+            if same_type_count > 0:
+                room_name = f"{room_name}{same_type_count + 1}"
+        type_counts[room_type] += 1
+        
+        rooms_data.append({
+            'id': room_id,
+            'name': room_name,
+            'type': room_type,
+            'position': room_rounded[:2],
+            'size': room_rounded[2:],
+            'color': ROOM_COLORS.get(room_type, ROOM_COLORS['other']),
+            'devices': [
+                {
+                    'id': f'{room_id}-light',
+                    'type': 'light',
+                    'name': f'{room_name}灯',
+                    'offset': [0, 0],
+                    'isOn': True
+                }
+            ]
+        })
+    
+    # Build homeData
+    home_data = {
+        'meta': {
+            'version': '2.0',
+            'name': '识别户型',
+            'unit': 'meter',
+            'wallHeight': wall_height,
+            'wallThickness': 0.1
+        },
+        'rooms': rooms_data,
+        'walls': []
+    }
+    
+    # Recognition info for debugging
+    recognition_info = {
+        'image_size': {'width': img_width, 'height': img_height},
+        'scale_used': scale,
+        'rooms_detected': len(room_result.rooms),
+        'walls_detected': len(wall_result.walls),
+        'preprocessing': {
+            'rotation_applied': preprocess_result.was_rotated,
+            'rotation_angle': preprocess_result.rotation_angle,
+            'scale_factor': preprocess_result.scale_factor
+        }
+    }
+    
+    return HomeDataResponse(
+        success=True,
+        message=f"成功识别 {len(rooms_data)} 个房间",
+        homeData=home_data,
+        recognition_info=recognition_info
+    )
+
+
 @router.post(
     "/recognize-and-generate",
     response_model=HomeDataResponse,
@@ -103,124 +280,76 @@ async def recognize_and_generate(request: RecognizeAndGenerateRequest):
     """
     try:
         # Step 1: Validate and decode image
-        upload_result = ImageService.process_upload(
+        upload_result = await ImageService.process_upload_async(
             base64_image=request.image,
-            filename=request.filename
+            filename=request.filename,
+            max_dimension=PreprocessingConfig.MAX_DIMENSION
         )
         pil_image = upload_result["image"]
         
-        # Step 2: Preprocess
-        preprocess_result = preprocess_pil_image(pil_image)
-        
-        # Step 3: Detect walls
-        wall_result = detect_walls(preprocess_result.processed)
-        
-        # Step 4: Detect rooms
-        room_result = detect_rooms(wall_result.binary_image)
-        
-        if len(room_result.rooms) == 0:
-            raise HTTPException(
-                status_code=400,
-                detail={"success": False, "error": "无法识别房间，请上传更清晰的户型图"}
-            )
-        
-        # Step 5: Convert to homeData format
-        scale = request.scale or 50.0  # pixels per meter
-        wall_height = request.wall_height or 3.0
-        
-        # Calculate image center for coordinate transformation
-        img_width, img_height = room_result.image_size
-        center_x = img_width / 2
-        center_y = img_height / 2
-        
-        # Sort rooms by area (largest first)
-        sorted_rooms = sorted(room_result.rooms, key=lambda r: r.area, reverse=True)
-        
-        # Generate room data
-        rooms_data = []
-        for i, room in enumerate(sorted_rooms):
-            # Convert pixel coordinates to meters (centered at origin)
-            room_center_x = (room.center[0] - center_x) / scale
-            room_center_z = (room.center[1] - center_y) / scale
-            room_width = room.width / scale
-            room_depth = room.height / scale
-            
-            # Infer room type
-            area_m2 = room_width * room_depth
-            aspect = room_width / room_depth if room_depth > 0 else 1
-            room_type = infer_room_type(i, area_m2, aspect, len(sorted_rooms))
-            
-            # Get custom name or generate default
-            room_id = f"room-{i+1}"
-            if request.room_names and room_id in request.room_names:
-                room_name = request.room_names[room_id]
-            else:
-                type_names = {
-                    'living': '客厅',
-                    'dining': '餐厅',
-                    'kitchen': '厨房',
-                    'bedroom': '卧室',
-                    'bathroom': '卫生间',
-                    'balcony': '阳台',
-                    'study': '书房',
-                    'hallway': '走廊',
-                    'other': f'房间{i+1}'
-                }
-                room_name = type_names.get(room_type, f'房间{i+1}')
-                # Add number suffix for duplicate types
-                same_type_count = sum(1 for r in rooms_data if r['type'] == room_type)
-                if same_type_count > 0:
-                    room_name = f"{room_name}{same_type_count + 1}"
-            
-            rooms_data.append({
-                'id': room_id,
-                'name': room_name,
-                'type': room_type,
-                'position': [round(room_center_x, 2), round(room_center_z, 2)],
-                'size': [round(room_width, 2), round(room_depth, 2)],
-                'color': ROOM_COLORS.get(room_type, ROOM_COLORS['other']),
-                'devices': [
-                    {
-                        'id': f'{room_id}-light',
-                        'type': 'light',
-                        'name': f'{room_name}灯',
-                        'offset': [0, 0],
-                        'isOn': True
-                    }
-                ]
-            })
-        
-        # Build homeData
-        home_data = {
-            'meta': {
-                'version': '2.0',
-                'name': '识别户型',
-                'unit': 'meter',
-                'wallHeight': wall_height,
-                'wallThickness': 0.1
-            },
-            'rooms': rooms_data,
-            'walls': []
-        }
+        return await generate_home_data(
+            pil_image,
+            scale=request.scale,
+            wall_height=request.wall_height,
+            room_names=request.room_names,
+            original_size=upload_result["original_size"]
+        )
         
-        # Recognition info for debugging
-        recognition_info = {
-            'image_size': {'width': img_width, 'height': img_height},
-            'scale_used': scale,
-            'rooms_detected': len(room_result.rooms),
-            'walls_detected': len(wall_result.walls),
-            'preprocessing': {
-                'rotation_applied': preprocess_result.was_rotated,
-                'rotation_angle': preprocess_result.rotation_angle,
-                'scale_factor': preprocess_result.scale_factor
-            }
-        }
+    except ImageValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"success": False, "error": str(e)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"success": False, "error": f"处理错误: {str(e)}"}
+        )
+
+
+@router.post(
+    "/recognize-and-generate-multipart",
+    response_model=HomeDataResponse,
+    responses={
+        400: {"description": "Invalid image"},
+        500: {"description": "Processing error"}
+    }
+)
+async def recognize_and_generate_multipart(
+    image: UploadFile = File(..., description="Floor plan image file"),
+    meta: str = Form("{}", description="JSON encoded RecognizeAndGenerateMeta")
+):
+    """
+    Same pipeline as /recognize-and-generate, with the image sent as a
+    multipart file part instead of base64 inside JSON.
+    
+    The image bytes are used directly, which avoids the base64 inflation
+    on the wire and the decode and string validation passes on the server.
+    """
+    try:
+        options = RecognizeAndGenerateMeta.model_validate_json(meta)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"success": False, "error": f"Invalid meta: {str(e)}"}
+        )
+    
+    try:
+        upload_result = ImageService.process_upload_bytes(
+            await image.read(),
+            filename=image.filename,
+            max_dimension=PreprocessingConfig.MAX_DIMENSION
+        )
+        pil_image = upload_result["image"]
         
-        return HomeDataResponse(
-            success=True,
-            message=f"成功识别 {len(rooms_data)} 个房间",
-            homeData=home_data,
-            recognition_info=recognition_info
+        return await generate_home_data(
+            pil_image,
+            scale=options.scale,
+            wall_height=options.wall_height,
+            room_names=options.room_names,
+            original_size=upload_result["original_size"]
         )
         
     except ImageValidationError as e:
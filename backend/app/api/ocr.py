@@ -8,12 +8,13 @@ Requirements covered:
 - 5.4: Assign default name when no label detected
 """
 from fastapi import APIRouter, HTTPException
+from functools import lru_cache
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import base64
+from typing import List, Optional, Dict, Any, Tuple
 import numpy as np
-import cv2
 
+from app.core.executor import run_in_executor
+from app.services.image_service import ImageService, ImageValidationError
 from app.services.ocr_service import (
     OCRService,
     LabelAssociator,
@@ -27,6 +28,12 @@ from app.services.ocr_service import (
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def get_service() -> OCRService:
+    """Shared OCRService instance, built once instead of per request."""
+    return OCRService()
+
+
 class OCRRequest(BaseModel):
     """Request model for OCR text detection"""
     image: str = Field(..., description="Base64 encoded image data")
@@ -67,29 +74,36 @@ def decode_base64_image(base64_string: str) -> np.ndarray:
     """
     Decode a base64 encoded image to numpy array.
     
+    Uses the same decoder as the image endpoints (libjpeg-turbo for JPEGs
+    when available, cv2.imdecode otherwise).
+    
     Args:
         base64_string: Base64 encoded image data
         
     Returns:
         OpenCV image (BGR format)
+        
+    Raises:
+        ImageValidationError: If the data is not a decodable image
     """
-    # Remove data URL prefix if present
-    if ',' in base64_string:
-        base64_string = base64_string.split(',')[1]
-    
-    # Decode base64
-    image_bytes = base64.b64decode(base64_string)
-    
-    # Convert to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    
-    # Decode image
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if image is None:
-        raise ValueError("Failed to decode image")
+    image_bytes, _ = ImageService.decode_base64_image(base64_string)
+    image_format = ImageService.sniff_format(image_bytes)
+    return ImageService.decode_pixels(image_bytes, image_format)
+
+
+def _decode_and_detect(
+    base64_string: str,
+    language: Optional[str]
+) -> Tuple[Tuple[int, int], OCRResult]:
+    """
+    Decode an uploaded image and run OCR on it.
     
-    return image
+    Returns:
+        Tuple of ((width, height), OCRResult)
+    """
+    image = decode_base64_image(base64_string)
+    height, width = image.shape[:2]
+    return (width, height), get_service().detect_text(image, language)
 
 
 @router.post("/ocr/detect", response_model=OCRResponse)
@@ -107,19 +121,17 @@ async def detect_text(request: OCRRequest) -> OCRResponse:
         OCRResponse with detected text labels
     """
     try:
-        # Decode image
-        image = decode_base64_image(request.image)
-        
-        # Run OCR
-        ocr_service = OCRService()
-        result = ocr_service.detect_text(image, request.language)
+        # Decode image and run OCR
+        _, result = await run_in_executor(
+            _decode_and_detect, request.image, request.language
+        )
         
         return OCRResponse(
             success=True,
             data=result.to_dict()
         )
         
-    except ValueError as e:
+    except (ValueError, ImageValidationError) as e:
         return OCRResponse(
             success=False,
             error=f"Invalid image: {str(e)}"
@@ -147,20 +159,17 @@ async def associate_labels(request: LabelAssociationRequest) -> LabelAssociation
         LabelAssociationResponse with room-label associations
     """
     try:
-        # Decode image
-        image = decode_base64_image(request.image)
-        height, width = image.shape[:2]
-        
-        # Run OCR
-        ocr_service = OCRService()
-        ocr_result = ocr_service.detect_text(image, request.language)
+        # Decode image and run OCR
+        image_size, ocr_result = await run_in_executor(
+            _decode_and_detect, request.image, request.language
+        )
         
         # Associate labels with rooms
         associator = LabelAssociator()
         associations = associator.associate_labels(
             rooms=request.rooms,
             labels=ocr_result.labels,
-            image_size=(width, height)
+            image_size=image_size
         )
         
         return LabelAssociationResponse(
@@ -174,7 +183,7 @@ async def associate_labels(request: LabelAssociationRequest) -> LabelAssociation
             }
         )
         
-    except ValueError as e:
+    except (ValueError, ImageValidationError) as e:
         return LabelAssociationResponse(
             success=False,
             error=f"Invalid input: {str(e)}"
@@ -8,21 +8,25 @@ Requirements covered:
 - 2.4: Detect and correct image rotation if skewed
 - 2.5: Normalize image resolution for consistent processing
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel, Field
 from typing import Optional
-import base64
-import io
+import pybase64 as base64
+import cv2
+import numpy as np
 
+from app.core.executor import run_in_executor
 from app.services.image_service import ImageService, ImageValidationError
 from app.services.preprocessing import (
-    ImagePreprocessor,
     PreprocessingConfig,
+    PreprocessingResult,
     preprocess_pil_image
 )
 
 router = APIRouter()
 
+WEBP_ENCODE_PARAMS = [cv2.IMWRITE_WEBP_QUALITY, 85]
+
 
 class PreprocessRequest(BaseModel):
     """Request model for image preprocessing"""
@@ -34,6 +38,11 @@ class PreprocessRequest(BaseModel):
         None,
         description="Original filename for format detection"
     )
+    return_image: bool = Field(
+        True,
+        description="Include the processed image in the /preprocess response; "
+                    "set to false when only the metadata is needed"
+    )
 
 
 class PreprocessResponse(BaseModel):
@@ -55,19 +64,62 @@ class PreprocessResponse(BaseModel):
     scale_factor: float = Field(..., description="Scale factor applied for normalization")
     
     # Processed image data
-    processed_image: str = Field(
-        ..., 
-        description="Base64 encoded preprocessed grayscale image"
+    processed_image: Optional[str] = Field(
+        None,
+        description="Base64 encoded preprocessed grayscale WebP image "
+                    "(omitted when return_image is false)"
     )
 
 
+def _preprocess_request(request: PreprocessRequest) -> PreprocessingResult:
+    """
+    Validate the uploaded image and run the preprocessing pipeline.
+    
+    Raises:
+        HTTPException: 413 if the image is too large, 400 if it is invalid
+    """
+    try:
+        upload_result = ImageService.process_upload(
+            base64_image=request.image,
+            filename=request.filename,
+            max_dimension=PreprocessingConfig.MAX_DIMENSION
+        )
+    except ImageValidationError as e:
+        error_msg = str(e)
+        
+        if "exceeds maximum" in error_msg.lower():
+            raise HTTPException(
+                status_code=413,
+                detail={"success": False, "error": error_msg}
+            )
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail={"success": False, "error": error_msg}
+            )
+    
+    pil_image = upload_result["image"]
+    
+    # Run preprocessing pipeline; sizes are reported against the upload
+    return preprocess_pil_image(pil_image, upload_result["original_size"])
+
+
+def _encode_webp(image: np.ndarray) -> bytes:
+    """Encode a processed image as WebP directly from the OpenCV array."""
+    ok, buffer = cv2.imencode(".webp", image, WEBP_ENCODE_PARAMS)
+    if not ok:
+        raise ValueError("Failed to encode processed image")
+    return buffer.tobytes()
+
+
 @router.post(
     "/preprocess",
     response_model=PreprocessResponse,
     responses={
         400: {"description": "Invalid image"},
         413: {"description": "File too large"}
-    }
+    },
+    deprecated=True
 )
 async def preprocess_image_endpoint(request: PreprocessRequest):
     """
@@ -80,27 +132,20 @@ async def preprocess_image_endpoint(request: PreprocessRequest):
     4. Detect and correct skew
     5. Normalize resolution
     
-    Returns the preprocessed image along with preprocessing metadata.
+    Returns the preprocessed image along with preprocessing metadata,
+    or only the metadata when return_image is false.
+    
+    Deprecated: use /preprocess/raw, which returns the image as binary
+    WebP instead of base64 inside JSON.
     """
     try:
-        # First validate and decode the image
-        upload_result = ImageService.process_upload(
-            base64_image=request.image,
-            filename=request.filename
-        )
-        
-        pil_image = upload_result["image"]
-        
-        # Run preprocessing pipeline
-        result = preprocess_pil_image(pil_image)
+        result = await run_in_executor(_preprocess_request, request)
         
         # Encode processed image to base64
-        from PIL import Image
-        processed_pil = ImagePreprocessor.cv2_to_pil(result.processed)
-        
-        buffer = io.BytesIO()
-        processed_pil.save(buffer, format="PNG")
-        processed_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        processed_image = None
+        if request.return_image:
+            processed_base64 = base64.b64encode_as_string(_encode_webp(result.processed))
+            processed_image = f"data:image/webp;base64,{processed_base64}"
         
         return PreprocessResponse(
             success=True,
@@ -112,22 +157,57 @@ async def preprocess_image_endpoint(request: PreprocessRequest):
             rotation_angle=result.rotation_angle,
             was_rotated=result.was_rotated,
             scale_factor=result.scale_factor,
-            processed_image=f"data:image/png;base64,{processed_base64}"
+            processed_image=processed_image
         )
         
-    except ImageValidationError as e:
-        error_msg = str(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"success": False, "error": f"Preprocessing error: {str(e)}"}
+        )
+
+
+@router.post(
+    "/preprocess/raw",
+    response_class=Response,
+    responses={
+        200: {
+            "content": {"image/webp": {}},
+            "description": "Preprocessed grayscale image"
+        },
+        400: {"description": "Invalid image"},
+        413: {"description": "File too large"}
+    }
+)
+async def preprocess_image_raw_endpoint(request: PreprocessRequest) -> Response:
+    """
+    Preprocess a floor plan image and return the result as a WebP image.
+    
+    Runs the same pipeline as /preprocess, but sends the processed image
+    as the response body instead of base64 inside JSON. Preprocessing
+    metadata is returned in the X-* response headers.
+    """
+    try:
+        result = await run_in_executor(_preprocess_request, request)
         
-        if "exceeds maximum" in error_msg.lower():
-            raise HTTPException(
-                status_code=413,
-                detail={"success": False, "error": error_msg}
-            )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail={"success": False, "error": error_msg}
-            )
+        return Response(
+            content=_encode_webp(result.processed),
+            media_type="image/webp",
+            headers={
+                "X-Original-Width": str(result.original_size[0]),
+                "X-Original-Height": str(result.original_size[1]),
+                "X-Processed-Width": str(result.processed_size[0]),
+                "X-Processed-Height": str(result.processed_size[1]),
+                "X-Rotation-Angle": str(result.rotation_angle),
+                "X-Was-Rotated": str(result.was_rotated).lower(),
+                "X-Scale-Factor": str(result.scale_factor)
+            }
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
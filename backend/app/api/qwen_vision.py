@@ -4,10 +4,12 @@ Qwen Vision API Endpoints
 Provides endpoints for Alibaba Qwen VL based floor plan analysis.
 """
 from fastapi import APIRouter
+from functools import lru_cache
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
-import base64
+import pybase64 as base64
 
+from app.core.base64_utils import strip_data_uri, detect_image_type
 from app.services.qwen_vision_service import (
     QwenVisionService,
     convert_to_homedata_rooms
@@ -16,6 +18,12 @@ from app.services.qwen_vision_service import (
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def get_service() -> QwenVisionService:
+    """Shared QwenVisionService instance, so its HTTP client is reused across requests."""
+    return QwenVisionService()
+
+
 class QwenAnalyzeRequest(BaseModel):
     image: str = Field(..., description="Base64 encoded image data")
     pixels_per_meter: float = Field(default=50.0)
@@ -36,7 +44,7 @@ class QwenStatusResponse(BaseModel):
 
 @router.get("/qwen/status", response_model=QwenStatusResponse)
 async def check_qwen_status() -> QwenStatusResponse:
-    service = QwenVisionService()
+    service = get_service()
     if service.is_configured():
         return QwenStatusResponse(
             configured=True,
@@ -52,7 +60,7 @@ async def check_qwen_status() -> QwenStatusResponse:
 
 @router.post("/qwen/analyze", response_model=QwenAnalyzeResponse)
 async def analyze_floor_plan(request: QwenAnalyzeRequest) -> QwenAnalyzeResponse:
-    service = QwenVisionService()
+    service = get_service()
     
     if not service.is_configured():
         return QwenAnalyzeResponse(
@@ -61,11 +69,19 @@ async def analyze_floor_plan(request: QwenAnalyzeRequest) -> QwenAnalyzeResponse
         )
     
     try:
-        image_data = request.image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        image_data = strip_data_uri(request.image)
+        
+        try:
+            decoded = base64.b64decode(image_data, validate=True)
+        except Exception as e:
+            return QwenAnalyzeResponse(
+                success=False,
+                error=f"Invalid base64 image data: {str(e)}"
+            )
         
-        result = await service.analyze_floor_plan(image_data)
+        result = await service.analyze_floor_plan(
+            image_data, image_type=detect_image_type(decoded)
+        )
         
         homedata_rooms = convert_to_homedata_rooms(
             result, 1000, 800, request.pixels_per_meter
@@ -89,7 +105,7 @@ async def analyze_with_dimensions(
     image_width: int = 1000,
     image_height: int = 800
 ) -> QwenAnalyzeResponse:
-    service = QwenVisionService()
+    service = get_service()
     
     if not service.is_configured():
         return QwenAnalyzeResponse(
@@ -98,11 +114,19 @@ async def analyze_with_dimensions(
         )
     
     try:
-        image_data = request.image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        image_data = strip_data_uri(request.image)
+        
+        try:
+            decoded = base64.b64decode(image_data, validate=True)
+        except Exception as e:
+            return QwenAnalyzeResponse(
+                success=False,
+                error=f"Invalid base64 image data: {str(e)}"
+            )
         
-        result = await service.analyze_floor_plan(image_data)
+        result = await service.analyze_floor_plan(
+            image_data, image_type=detect_image_type(decoded)
+        )
         
         homedata_rooms = convert_to_homedata_rooms(
             result, image_width, image_height, request.pixels_per_meter
@@ -8,17 +8,18 @@ Requirements covered:
 - 4.4: Detect room shape (rectangular, L-shaped, etc.)
 """
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import List, Optional, Dict
-import base64
-import io
 
+from app.core.base64_utils import encode_png_data_uri
+from app.core.executor import run_in_executor
 from app.services.image_service import ImageService, ImageValidationError
-from app.services.preprocessing import preprocess_pil_image
+from app.services.preprocessing import preprocess_image
 from app.services.wall_detection import detect_walls
 from app.services.room_detection import (
     RoomDetector,
     RoomDetectionConfig,
+    RoomDetectionResult,
     detect_rooms
 )
 
@@ -43,6 +44,8 @@ class RoomDetectionRequest(BaseModel):
 
 class RoomBounds(BaseModel):
     """Room bounding rectangle"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     x: int = Field(..., description="X coordinate of top-left corner")
     y: int = Field(..., description="Y coordinate of top-left corner")
     width: int = Field(..., description="Room width in pixels")
@@ -51,12 +54,16 @@ class RoomBounds(BaseModel):
 
 class RoomCenter(BaseModel):
     """Room center position"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     x: float = Field(..., description="X coordinate of center")
     y: float = Field(..., description="Y coordinate of center")
 
 
 class RoomVertex(BaseModel):
     """Room polygon vertex"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     x: int = Field(..., description="X coordinate")
     y: int = Field(..., description="Y coordinate")
 
@@ -75,6 +82,10 @@ class RoomInfo(BaseModel):
     rectangularity: float = Field(..., description="How rectangular the room is")
 
 
+# Built once at import; validates the whole room list per request
+ROOMS_ADAPTER = TypeAdapter(List[RoomInfo])
+
+
 class RoomDetectionResponse(BaseModel):
     """Response model for room detection result"""
     success: bool = True
@@ -104,6 +115,24 @@ class RoomDetectionResponse(BaseModel):
     )
 
 
+def run_room_pipeline(request: RoomDetectionRequest) -> RoomDetectionResult:
+    """Validate the uploaded image, preprocess it and detect rooms."""
+    upload_result = ImageService.process_upload_ndarray(
+        base64_image=request.image,
+        filename=request.filename
+    )
+    preprocess_result = preprocess_image(upload_result["image"])
+    
+    # Detect walls first to get binary image
+    wall_result = detect_walls(preprocess_result.processed)
+    
+    # Detect rooms using the binary image from wall detection
+    return detect_rooms(
+        wall_result.binary_image,
+        wall_result.edges_image
+    )
+
+
 @router.post(
     "/detect-rooms",
     response_model=RoomDetectionResponse,
@@ -127,42 +156,11 @@ async def detect_rooms_endpoint(request: RoomDetectionRequest):
     Returns detected rooms with metadata.
     """
     try:
-        # Validate and decode the image
-        upload_result = ImageService.process_upload(
-            base64_image=request.image,
-            filename=request.filename
-        )
-        
-        pil_image = upload_result["image"]
-        
-        # Preprocess the image
-        preprocess_result = preprocess_pil_image(pil_image)
-        
-        # Detect walls first to get binary image
-        wall_result = detect_walls(preprocess_result.processed)
-        
-        # Detect rooms using the binary image from wall detection
-        room_result = detect_rooms(
-            wall_result.binary_image,
-            wall_result.edges_image
-        )
+        # Decode, preprocess, detect walls and rooms (off the event loop)
+        room_result = await run_in_executor(run_room_pipeline, request)
         
-        # Convert rooms to response format
-        rooms_info = []
-        for room in room_result.rooms:
-            room_dict = room.to_dict()
-            rooms_info.append(RoomInfo(
-                id=room_dict["id"],
-                bounds=RoomBounds(**room_dict["bounds"]),
-                center=RoomCenter(**room_dict["center"]),
-                area=room_dict["area"],
-                perimeter=room_dict["perimeter"],
-                shape=room_dict["shape"],
-                confidence=room_dict["confidence"],
-                vertices=[RoomVertex(**v) for v in room_dict["vertices"]],
-                aspect_ratio=room_dict["aspect_ratio"],
-                rectangularity=room_dict["rectangularity"]
-            ))
+        # Convert rooms to response format in a single pydantic-core call
+        rooms_info = ROOMS_ADAPTER.validate_python(room_result.rooms_as_dicts())
         
         # Encode debug images
         filled_base64 = None
@@ -171,25 +169,12 @@ async def detect_rooms_endpoint(request: RoomDetectionRequest):
         include_debug = request.options and request.options.get("include_debug", False)
         
         if include_debug:
-            from PIL import Image
-            
-            # Encode filled image
-            filled_pil = Image.fromarray(room_result.filled_image)
-            buffer = io.BytesIO()
-            filled_pil.save(buffer, format="PNG")
-            filled_base64 = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
-            
-            # Encode contour visualization
-            # Convert BGR to RGB for PIL
-            import cv2
-            contour_rgb = cv2.cvtColor(room_result.contour_image, cv2.COLOR_BGR2RGB)
-            contour_pil = Image.fromarray(contour_rgb)
-            buffer = io.BytesIO()
-            contour_pil.save(buffer, format="PNG")
-            contour_base64 = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+            filled_base64 = encode_png_data_uri(room_result.filled_image)
+            # Contour visualization is BGR, which cv2.imencode expects as is
+            contour_base64 = encode_png_data_uri(room_result.contour_image)
         
         # Get shape distribution
-        shape_dist = room_result.to_dict()["shape_distribution"]
+        shape_dist = room_result.shape_distribution
         
         return RoomDetectionResponse(
             success=True,
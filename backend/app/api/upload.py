@@ -8,8 +8,10 @@ Requirements covered:
 - 1.5: Limit file size to 10MB
 - 1.6: Reject files exceeding 10MB
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, HTTPException, Response, UploadFile
+import orjson
 
+from app.core.executor import run_in_executor
 from app.models.upload import (
     ImageUploadRequest,
     ImageUploadResponse,
@@ -19,11 +21,29 @@ from app.services.image_service import ImageService, ImageValidationError
 
 router = APIRouter()
 
+# Constant status payload, serialized once at import
+UPLOAD_STATUS_BODY = orjson.dumps({"status": "ready"})
+STATUS_CACHE_HEADERS = {"Cache-Control": "public, max-age=60"}
+
+
+def validation_error_response(error: ImageValidationError) -> HTTPException:
+    """Map an image validation error to 413 for size limits, 400 otherwise."""
+    error_msg = str(error)
+    status_code = 413 if "exceeds maximum" in error_msg.lower() else 400
+    return HTTPException(
+        status_code=status_code,
+        detail={"success": False, "error": error_msg}
+    )
+
 
 @router.get("/upload/status")
 async def upload_status():
     """Check upload endpoint status"""
-    return {"status": "ready"}
+    return Response(
+        content=UPLOAD_STATUS_BODY,
+        media_type="application/json",
+        headers=STATUS_CACHE_HEADERS
+    )
 
 
 @router.post(
@@ -45,9 +65,10 @@ async def upload_image(request: ImageUploadRequest):
     - Data URI format (e.g., "data:image/png;base64,...")
     """
     try:
-        result = ImageService.process_upload(
-            base64_image=request.image,
-            filename=request.filename
+        result = await run_in_executor(
+            ImageService.inspect_upload,
+            request.image,
+            request.filename
         )
         
         return ImageUploadResponse(
@@ -61,19 +82,54 @@ async def upload_image(request: ImageUploadRequest):
         )
         
     except ImageValidationError as e:
-        error_msg = str(e)
+        raise validation_error_response(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"success": False, "error": f"Internal error: {str(e)}"}
+        )
+
+
+@router.post(
+    "/upload/binary",
+    response_model=ImageUploadResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid image"},
+        413: {"model": ErrorResponse, "description": "File too large"}
+    }
+)
+async def upload_image_binary(
+    file: UploadFile = File(..., description="Floor plan image file")
+):
+    """
+    Upload a floor plan image as a multipart file part.
+    
+    Same checks and response as /upload, without the base64 inflation
+    on the wire or the decode pass on the server.
+    """
+    try:
+        if file.size is not None:
+            # Reject from the part size before reading the body
+            ImageService.check_size(file.size)
         
-        # Determine appropriate status code
-        if "exceeds maximum" in error_msg.lower():
-            raise HTTPException(
-                status_code=413,
-                detail={"success": False, "error": error_msg}
-            )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail={"success": False, "error": error_msg}
-            )
+        result = await run_in_executor(
+            ImageService.inspect_upload_bytes,
+            await file.read(),
+            file.filename
+        )
+        
+        return ImageUploadResponse(
+            success=True,
+            message="Image uploaded successfully",
+            image_id=result["image_id"],
+            width=result["width"],
+            height=result["height"],
+            format=result["format"],
+            size_bytes=result["size_bytes"]
+        )
+        
+    except ImageValidationError as e:
+        raise validation_error_response(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
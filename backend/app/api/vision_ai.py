@@ -3,11 +3,13 @@ Vision AI API Endpoints
 
 Provides endpoints for GPT-4 Vision based floor plan analysis.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from functools import lru_cache
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
-import base64
+from typing import Optional, Dict, Any, List, Literal
+import pybase64 as base64
 
+from app.core.base64_utils import strip_data_uri
 from app.services.vision_ai_service import (
     VisionAIService,
     VisionAnalysisResult,
@@ -17,15 +19,23 @@ from app.services.vision_ai_service import (
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def get_service() -> VisionAIService:
+    """Shared VisionAIService instance, built once instead of per request."""
+    return VisionAIService()
+
+
 class VisionAnalyzeRequest(BaseModel):
     """Request model for Vision AI floor plan analysis"""
     image: str = Field(..., description="Base64 encoded image data")
-    detail: str = Field(
+    detail: Literal["low", "high", "auto"] = Field(
         default="high",
         description="Image detail level: 'low', 'high', or 'auto'"
     )
     pixels_per_meter: float = Field(
         default=50.0,
+        gt=0,
+        le=10000,
         description="Scale factor for coordinate conversion"
     )
 
@@ -45,28 +55,67 @@ class VisionStatusResponse(BaseModel):
     message: str
 
 
-@router.get("/vision/status", response_model=VisionStatusResponse)
-async def check_vision_status() -> VisionStatusResponse:
+def build_vision_response(
+    result: VisionAnalysisResult,
+    image_width: int,
+    image_height: int,
+    pixels_per_meter: float
+) -> VisionAnalyzeResponse:
+    """Build the successful analyze response shared by both analyze endpoints."""
+    return VisionAnalyzeResponse(
+        success=True,
+        data=result.to_dict(),
+        homedata_rooms=convert_to_homedata_rooms(
+            result,
+            image_width,
+            image_height,
+            pixels_per_meter
+        )
+    )
+
+
+# Status only changes on restart, so clients and probes may cache it briefly
+STATUS_CACHE_HEADERS = {"Cache-Control": "public, max-age=60"}
+
+
+@lru_cache(maxsize=1)
+def get_status_body() -> bytes:
     """
-    Check if Vision AI service is properly configured.
+    Serialized /vision/status payload.
     
-    Returns:
-        VisionStatusResponse with configuration status
+    The shared service's configuration is fixed for the process lifetime,
+    so the response is built and serialized once.
     """
-    service = VisionAIService()
+    service = get_service()
     
     if service.is_configured():
-        return VisionStatusResponse(
+        status = VisionStatusResponse(
             configured=True,
             model=service.model,
             message="Vision AI service is configured and ready"
         )
     else:
-        return VisionStatusResponse(
+        status = VisionStatusResponse(
             configured=False,
             model=service.model,
             message="OpenAI API key not configured. Set OPENAI_API_KEY environment variable."
         )
+    return status.model_dump_json().encode()
+
+
+@router.get("/vision/status", response_model=VisionStatusResponse)
+async def check_vision_status() -> Response:
+    """
+    Check if Vision AI service is properly configured.
+    
+    Returns:
+        VisionStatusResponse with configuration status
+    """
+    return Response(
+        content=get_status_body(),
+        media_type="application/json",
+        headers=STATUS_CACHE_HEADERS
+    )
 
 
 @router.post("/vision/analyze", response_model=VisionAnalyzeResponse)
@@ -84,7 +133,7 @@ async def analyze_floor_plan(request: VisionAnalyzeRequest) -> VisionAnalyzeResp
     Returns:
         VisionAnalyzeResponse with detected rooms
     """
-    service = VisionAIService()
+    service = get_service()
     
     if not service.is_configured():
         return VisionAnalyzeResponse(
@@ -94,14 +143,11 @@ async def analyze_floor_plan(request: VisionAnalyzeRequest) -> VisionAnalyzeResp
     
     try:
         # Remove data URL prefix if present
-        image_data = request.image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        image_data = strip_data_uri(request.image)
         
         # Validate base64
         try:
-            decoded = base64.b64decode(image_data)
-            image_size = len(decoded)
+            base64.b64decode(image_data, validate=True)
         except Exception as e:
             return VisionAnalyzeResponse(
                 success=False,
@@ -117,20 +163,13 @@ async def analyze_floor_plan(request: VisionAnalyzeRequest) -> VisionAnalyzeResp
         estimated_width = 1000
         estimated_height = 800
         
-        # Convert to homeData format
-        homedata_rooms = convert_to_homedata_rooms(
+        return build_vision_response(
             result,
             estimated_width,
             estimated_height,
             request.pixels_per_meter
         )
         
-        return VisionAnalyzeResponse(
-            success=True,
-            data=result.to_dict(),
-            homedata_rooms=homedata_rooms
-        )
-        
     except ValueError as e:
         return VisionAnalyzeResponse(
             success=False,
@@ -163,7 +202,7 @@ async def analyze_floor_plan_with_dimensions(
     Returns:
         VisionAnalyzeResponse with detected rooms
     """
-    service = VisionAIService()
+    service = get_service()
     
     if not service.is_configured():
         return VisionAnalyzeResponse(
@@ -173,27 +212,19 @@ async def analyze_floor_plan_with_dimensions(
     
     try:
         # Remove data URL prefix if present
-        image_data = request.image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        image_data = strip_data_uri(request.image)
         
         # Analyze the floor plan
         result = await service.analyze_floor_plan(image_data, request.detail)
         
         # Convert to homeData format with actual dimensions
-        homedata_rooms = convert_to_homedata_rooms(
+        return build_vision_response(
             result,
             image_width,
             image_height,
             request.pixels_per_meter
         )
         
-        return VisionAnalyzeResponse(
-            success=True,
-            data=result.to_dict(),
-            homedata_rooms=homedata_rooms
-        )
-        
     except Exception as e:
         return VisionAnalyzeResponse(
             success=False,
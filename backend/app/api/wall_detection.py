@@ -8,16 +8,18 @@ Requirements covered:
 - 3.4: Output wall coordinates as line segments
 """
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import List, Optional
-import base64
-import io
+from collections import Counter
 
+from app.core.base64_utils import encode_png_data_uri
+from app.core.executor import run_in_executor
 from app.services.image_service import ImageService, ImageValidationError
-from app.services.preprocessing import preprocess_pil_image, ImagePreprocessor
+from app.services.preprocessing import preprocess_image, ImagePreprocessor
 from app.services.wall_detection import (
     WallDetector,
     WallDetectionConfig,
+    WallDetectionResult,
     detect_walls
 )
 
@@ -42,6 +44,8 @@ class WallDetectionRequest(BaseModel):
 
 class WallInfo(BaseModel):
     """Wall segment information"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     start: List[int] = Field(..., description="Start point [x, y]")
     end: List[int] = Field(..., description="End point [x, y]")
     thickness: float = Field(..., description="Wall thickness in pixels")
@@ -51,6 +55,10 @@ class WallInfo(BaseModel):
     angle: float = Field(..., description="Wall angle in degrees")
 
 
+# Built once at import; validates the whole wall list per request
+WALLS_ADAPTER = TypeAdapter(List[WallInfo])
+
+
 class WallDetectionResponse(BaseModel):
     """Response model for wall detection result"""
     success: bool = True
@@ -77,6 +85,16 @@ class WallDetectionResponse(BaseModel):
     )
 
 
+def run_wall_pipeline(request: WallDetectionRequest) -> WallDetectionResult:
+    """Validate the uploaded image, preprocess it and detect walls."""
+    upload_result = ImageService.process_upload_ndarray(
+        base64_image=request.image,
+        filename=request.filename
+    )
+    preprocess_result = preprocess_image(upload_result["image"])
+    return detect_walls(preprocess_result.processed)
+
+
 @router.post(
     "/detect-walls",
     response_model=WallDetectionResponse,
@@ -100,32 +118,11 @@ async def detect_walls_endpoint(request: WallDetectionRequest):
     Returns detected wall segments with metadata.
     """
     try:
-        # Validate and decode the image
-        upload_result = ImageService.process_upload(
-            base64_image=request.image,
-            filename=request.filename
-        )
-        
-        pil_image = upload_result["image"]
-        
-        # Preprocess the image
-        preprocess_result = preprocess_pil_image(pil_image)
-        
-        # Detect walls
-        detection_result = detect_walls(preprocess_result.processed)
+        # Decode, preprocess and detect walls (off the event loop)
+        detection_result = await run_in_executor(run_wall_pipeline, request)
         
         # Convert walls to response format
-        walls_info = []
-        for wall in detection_result.walls:
-            walls_info.append(WallInfo(
-                start=list(wall.start),
-                end=list(wall.end),
-                thickness=wall.thickness,
-                wall_type=wall.wall_type.value,
-                confidence=wall.confidence,
-                length=wall.length,
-                angle=wall.angle
-            ))
+        walls_info = WALLS_ADAPTER.validate_python(detection_result.walls_as_dicts())
         
         # Encode debug images
         edges_base64 = None
@@ -134,22 +131,13 @@ async def detect_walls_endpoint(request: WallDetectionRequest):
         include_debug = request.options and request.options.get("include_debug", False)
         
         if include_debug:
-            # Encode edges image
-            from PIL import Image
-            edges_pil = Image.fromarray(detection_result.edges_image)
-            buffer = io.BytesIO()
-            edges_pil.save(buffer, format="PNG")
-            edges_base64 = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
-            
-            # Encode binary image
-            binary_pil = Image.fromarray(detection_result.binary_image)
-            buffer = io.BytesIO()
-            binary_pil.save(buffer, format="PNG")
-            binary_base64 = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+            edges_base64 = encode_png_data_uri(detection_result.edges_image)
+            binary_base64 = encode_png_data_uri(detection_result.binary_image)
         
         # Count wall types
-        exterior_count = len([w for w in detection_result.walls if w.wall_type.value == "exterior"])
-        interior_count = len([w for w in detection_result.walls if w.wall_type.value == "interior"])
+        type_counts = Counter(w.wall_type.value for w in detection_result.walls)
+        exterior_count = type_counts["exterior"]
+        interior_count = type_counts["interior"]
         
         return WallDetectionResponse(
             success=True,
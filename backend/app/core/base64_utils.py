@@ -0,0 +1,122 @@
+"""
+Base64 and image header helpers shared by the image endpoints
+"""
+import cv2
+import numpy as np
+import pybase64 as base64
+
+# Debug images are transient, so favour encode speed over size
+DEBUG_PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+# detect_image_type needs 12 bytes, which is exactly 16 base64 characters
+IMAGE_SIGNATURE_BASE64_LENGTH = 16
+
+# Base64 prefixes of the common image signatures, so most payloads are
+# typed without decoding anything: PNG (89 50 4E 47 0D 0A 1A 0A),
+# JPEG (FF D8 FF), GIF87a and GIF89a
+BASE64_IMAGE_PREFIXES = (
+    ("iVBORw0KGg", "png"),
+    ("/9j/", "jpeg"),
+    ("R0lGODdh", "gif"),
+    ("R0lGODlh", "gif"),
+)
+
+# Data URI headers ("data:image/png;base64,") are always short, so the
+# separator search never needs to look further than this.
+DATA_URI_HEADER_MAX_LENGTH = 64
+
+
+def strip_data_uri(data: str) -> str:
+    """
+    Remove the data URI prefix from a base64 string if present.
+
+    Only the header region is searched for the separating comma, so
+    multi-MB payloads are not scanned end to end.
+
+    Args:
+        data: Base64 encoded data (with or without data URI prefix)
+
+    Returns:
+        Base64 payload without the prefix
+    """
+    index = data.find(',', 0, DATA_URI_HEADER_MAX_LENGTH)
+    return data[index + 1:] if index >= 0 else data
+
+
+def decoded_length(data: str) -> int:
+    """
+    Size in bytes that a base64 payload decodes to, without decoding it.
+
+    Args:
+        data: Base64 payload (data URI prefix already removed)
+
+    Returns:
+        Decoded length in bytes, exact for well formed padded input
+    """
+    return (len(data) * 3) // 4 - data[-2:].count('=')
+
+
+def detect_image_type(header: bytes) -> str:
+    """
+    Detect the image subtype from the leading bytes of an image.
+
+    Args:
+        header: Decoded image bytes (the first 12 bytes are enough)
+
+    Returns:
+        Image subtype for a MIME type ("png", "jpeg", "gif" or "webp"),
+        defaulting to "jpeg" when the signature is not recognized
+    """
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return "png"
+    elif header[:2] == b'\xff\xd8':
+        return "jpeg"
+    elif header[:6] in (b'GIF87a', b'GIF89a'):
+        return "gif"
+    elif header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return "webp"
+    return "jpeg"
+
+
+def encode_png_data_uri(image: np.ndarray) -> str:
+    """
+    Encode an OpenCV image (grayscale or BGR) as a PNG data URI.
+
+    Uses OpenCV's PNG encoder with low compression; intended for the
+    debug images returned by the detection endpoints.
+
+    Args:
+        image: Image array in OpenCV channel order
+
+    Returns:
+        "data:image/png;base64,..." string
+    """
+    ok, buffer = cv2.imencode(".png", image, DEBUG_PNG_PARAMS)
+    if not ok:
+        raise ValueError("Failed to encode debug image")
+    return f"data:image/png;base64,{base64.b64encode_as_string(buffer.tobytes())}"
+
+
+def detect_base64_image_type(data: str) -> str:
+    """
+    Detect the image subtype of a base64 payload from its first characters.
+
+    PNG, JPEG and GIF are recognized from their base64 prefix; otherwise
+    only the leading IMAGE_SIGNATURE_BASE64_LENGTH characters are decoded.
+
+    Args:
+        data: Base64 payload (data URI prefix already removed)
+
+    Returns:
+        Image subtype as returned by detect_image_type, or "jpeg" if the
+        leading characters are not valid base64
+    """
+    for prefix, image_type in BASE64_IMAGE_PREFIXES:
+        if data.startswith(prefix):
+            return image_type
+    
+    try:
+        header = base64.b64decode(data[:IMAGE_SIGNATURE_BASE64_LENGTH])
+    except ValueError:
+        return "jpeg"
+    return detect_image_type(header)
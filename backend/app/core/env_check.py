@@ -2,9 +2,11 @@
 Environment detection script for OpenCV and Tesseract
 """
 import sys
+from functools import lru_cache
 from typing import Dict, Any
 
 
+@lru_cache(maxsize=1)
 def check_opencv() -> Dict[str, Any]:
     """Check OpenCV installation"""
     result = {
@@ -23,6 +25,7 @@ def check_opencv() -> Dict[str, Any]:
     return result
 
 
+@lru_cache(maxsize=1)
 def check_tesseract() -> Dict[str, Any]:
     """Check Tesseract OCR installation"""
     result = {
@@ -57,6 +60,7 @@ def check_tesseract() -> Dict[str, Any]:
     return result
 
 
+@lru_cache(maxsize=1)
 def check_numpy() -> Dict[str, Any]:
     """Check NumPy installation"""
     result = {
@@ -75,6 +79,7 @@ def check_numpy() -> Dict[str, Any]:
     return result
 
 
+@lru_cache(maxsize=1)
 def check_pillow() -> Dict[str, Any]:
     """Check Pillow installation"""
     result = {
@@ -94,17 +99,71 @@ def check_pillow() -> Dict[str, Any]:
     return result
 
 
+@lru_cache(maxsize=1)
+def check_uvloop() -> Dict[str, Any]:
+    """Check uvloop installation (optional, faster event loop for uvicorn)"""
+    result = {
+        "installed": False,
+        "version": None,
+        "error": None
+    }
+    
+    try:
+        import uvloop
+        result["installed"] = True
+        result["version"] = uvloop.__version__
+    except ImportError as e:
+        result["error"] = str(e)
+    
+    return result
+
+
+@lru_cache(maxsize=1)
+def check_httptools() -> Dict[str, Any]:
+    """Check httptools installation (optional, faster HTTP parser for uvicorn)"""
+    result = {
+        "installed": False,
+        "version": None,
+        "error": None
+    }
+    
+    try:
+        import httptools
+        result["installed"] = True
+        result["version"] = httptools.__version__
+    except ImportError as e:
+        result["error"] = str(e)
+    
+    return result
+
+
 def check_all() -> Dict[str, Any]:
-    """Check all required dependencies"""
+    """
+    Check all required dependencies.
+    
+    Results are cached after the first call (the Tesseract check runs the
+    tesseract binary); call refresh() to check again.
+    """
     return {
         "python_version": sys.version,
         "opencv": check_opencv(),
         "tesseract": check_tesseract(),
         "numpy": check_numpy(),
-        "pillow": check_pillow()
+        "pillow": check_pillow(),
+        "uvloop": check_uvloop(),
+        "httptools": check_httptools()
     }
 
 
+def refresh() -> None:
+    """Clear the cached check results, e.g. after installing a dependency"""
+    for check in (
+        check_opencv, check_tesseract, check_numpy, check_pillow,
+        check_uvloop, check_httptools
+    ):
+        check.cache_clear()
+
+
 def print_env_status():
     """Print environment status to console"""
     status = check_all()
@@ -151,6 +210,15 @@ def print_env_status():
     else:
         print(f"  ✗ Not installed: {pillow['error']}")
     
+    # uvicorn uses these automatically when installed (uvicorn[standard])
+    print("\n--- Server accelerators (optional) ---")
+    for name in ("uvloop", "httptools"):
+        accelerator = status[name]
+        if accelerator["installed"]:
+            print(f"  ✓ {name}: v{accelerator['version']}")
+        else:
+            print(f"  ⚠ {name} not installed, uvicorn falls back to the pure-Python implementation")
+    
     print("\n" + "=" * 50)
     
     # Overall status
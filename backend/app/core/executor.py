@@ -0,0 +1,49 @@
+"""
+Shared worker pool for the CPU bound image pipelines
+
+Requests run the OpenCV pipelines on a pool sized to the CPU count, and
+OpenCV itself is limited to one thread per call. Concurrent requests then
+use one core each, instead of every request spawning a full OpenCV thread
+pool and oversubscribing the machine.
+
+Endpoints keep their blocking work (decoding uploads, the OpenCV pipelines,
+OCR) in plain synchronous functions and await them through run_in_executor,
+so the event loop stays free for other requests in the meantime.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import cv2
+
+T = TypeVar("T")
+
+
+def configure_opencv() -> None:
+    """Make each OpenCV call single threaded; parallelism comes from the pool."""
+    cv2.setNumThreads(1)
+    cv2.ocl.setUseOpenCL(False)
+
+
+@functools.lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pipeline executor, creating it on first use."""
+    return ThreadPoolExecutor(
+        max_workers=os.cpu_count() or 1,
+        thread_name_prefix="pipeline"
+    )
+
+
+async def run_in_executor(func: Callable[..., T], *args) -> T:
+    """Run a blocking function on the shared executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args))
+
+
+def shutdown_executor() -> None:
+    """Shut down the shared executor if it was ever created."""
+    if get_executor.cache_info().currsize:
+        get_executor().shutdown(wait=False, cancel_futures=True)
+        get_executor.cache_clear()
@@ -0,0 +1,36 @@
+"""
+Shared HTTP client for the outbound vision API calls
+"""
+from functools import lru_cache
+
+import httpx
+
+
+@lru_cache(maxsize=1)
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide AsyncClient.
+
+    All vision services share one connection pool, so TLS sessions and
+    HTTP/2 connections to the provider APIs are reused across requests.
+    Services pass their own per-request timeout. Failed connection
+    attempts are retried by the transport; requests that reached the
+    server are never resent.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(
+            max_connections=64,
+            max_keepalive_connections=32,
+            keepalive_expiry=30.0
+        )
+    )
+    return httpx.AsyncClient(transport=transport, timeout=60.0)
+
+
+async def close_client() -> None:
+    """Close the shared client if it was ever created."""
+    if get_client.cache_info().currsize:
+        await get_client().aclose()
+        get_client.cache_clear()
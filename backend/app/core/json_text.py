@@ -0,0 +1,64 @@
+"""
+Helpers for pulling JSON out of free-form model responses
+"""
+
+CODE_FENCE = "```"
+
+
+def _matching_brace(text: str, start: int) -> int:
+    """
+    Index of the brace closing the object opened at ``start``, or -1.
+
+    Braces inside JSON strings (including escaped quotes) are ignored.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+
+def extract_json_text(text: str) -> str:
+    """
+    Extract the JSON payload from a model response in a single pass.
+
+    The contents of the first fenced code block win (an optional ``json``
+    language tag is dropped). Otherwise the object starting at the first
+    ``{`` is returned up to its matching ``}``; if the braces never balance
+    the span up to the last ``}`` is returned instead. Text without any
+    object is returned unchanged.
+    """
+    fence = text.find(CODE_FENCE)
+    if fence != -1:
+        body = fence + len(CODE_FENCE)
+        if text.startswith("json", body):
+            body += 4
+        closing = text.find(CODE_FENCE, body)
+        if closing != -1:
+            return text[body:closing].strip()
+
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = _matching_brace(text, start)
+    if end == -1:
+        end = text.rfind("}")
+        if end < start:
+            return text
+    return text[start:end + 1]
@@ -1,16 +1,47 @@
 """
 Floor Plan Recognition API - Main Application
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import upload, preprocess, wall_detection, room_detection, generate, ocr, vision_ai, gemini_vision, qwen_vision
 from app.core.env_check import check_all
+from app.core.executor import configure_opencv, get_executor, shutdown_executor
+from app.core.http_client import close_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Set up shared resources before serving and release them on shutdown.
+    
+    OpenCV is limited to one thread per call (requests run on the shared
+    pool), the pool and vision services are built up front, and the Gemini
+    connection is opened so the first request does not pay for it.
+    """
+    configure_opencv()
+    get_executor()
+    vision_ai.get_service()
+    qwen_vision.get_service()
+    gemini = gemini_vision.get_service()
+    if gemini.is_configured():
+        await gemini.prewarm()
+    
+    yield
+    
+    await close_client()
+    shutdown_executor()
+
 
 app = FastAPI(
     title="Floor Plan Recognition API",
     description="API for recognizing 2D floor plans and converting them to 3D model data",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS to allow frontend access
@@ -5,6 +5,7 @@ from .preprocessing import (
     PreprocessingConfig,
     PreprocessingResult,
     preprocess_image,
+    preprocess_batch,
     preprocess_pil_image
 )
 from .wall_detection import (
@@ -28,12 +29,14 @@ from .ocr_service import (
     OCRConfig,
     OCRResult,
     TextLabel,
+    TextLabelBatch,
     LabelAssociator,
     RoomLabelAssociation,
     RoomType,
     ROOM_TYPE_KEYWORDS,
     DEFAULT_ROOM_NAMES,
     detect_text,
+    detect_text_batch,
     associate_labels_with_rooms
 )
 
@@ -44,6 +47,7 @@ __all__ = [
     "PreprocessingConfig",
     "PreprocessingResult",
     "preprocess_image",
+    "preprocess_batch",
     "preprocess_pil_image",
     "WallDetector",
     "WallDetectionConfig",
@@ -61,11 +65,13 @@ __all__ = [
     "OCRConfig",
     "OCRResult",
     "TextLabel",
+    "TextLabelBatch",
     "LabelAssociator",
     "RoomLabelAssociation",
     "RoomType",
     "ROOM_TYPE_KEYWORDS",
     "DEFAULT_ROOM_NAMES",
     "detect_text",
+    "detect_text_batch",
     "associate_labels_with_rooms"
 ]
@@ -11,14 +11,28 @@ Requirements covered:
 - 5.1: Use OCR to detect text in the image
 - 5.2: Identify room type keywords
 """
+import logging
 import os
-import base64
-import json
+import asyncio
+import functools
+import hashlib
+import itertools
 import httpx
+import numpy as np
+import orjson
+from collections import OrderedDict
 from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from app.core.base64_utils import strip_data_uri, detect_base64_image_type, decoded_length
+from app.core.config import settings
+from app.core.http_client import get_client
+from app.core.json_text import extract_json_text
+
+
+logger = logging.getLogger(__name__)
+
 
 class RoomType(Enum):
     """Room type classification"""
@@ -34,6 +48,34 @@ class RoomType(Enum):
     OTHER = "other"
 
 
+# Lookups shared by every response, built once at import
+_ROOM_TYPE_MAP = {
+    "living": RoomType.LIVING,
+    "bedroom": RoomType.BEDROOM,
+    "kitchen": RoomType.KITCHEN,
+    "bathroom": RoomType.BATHROOM,
+    "balcony": RoomType.BALCONY,
+    "dining": RoomType.DINING,
+    "study": RoomType.STUDY,
+    "storage": RoomType.STORAGE,
+    "hallway": RoomType.HALLWAY,
+    "other": RoomType.OTHER,
+}
+
+_ROOM_TYPE_COLORS = {
+    RoomType.LIVING: "#E8D4B8",
+    RoomType.BEDROOM: "#B8D4E8",
+    RoomType.KITCHEN: "#D4E8B8",
+    RoomType.BATHROOM: "#E8B8D4",
+    RoomType.BALCONY: "#D4B8E8",
+    RoomType.DINING: "#E8E8B8",
+    RoomType.STUDY: "#B8E8D4",
+    RoomType.STORAGE: "#D4D4D4",
+    RoomType.HALLWAY: "#E8E8E8",
+    RoomType.OTHER: "#C8C8C8",
+}
+
+
 @dataclass
 class DetectedRoom:
     """Represents a room detected by Vision AI"""
@@ -62,7 +104,7 @@ class GeminiAnalysisResult:
     total_rooms: int
     has_scale: bool
     scale_info: Optional[str]
-    raw_response: str
+    raw_response: Optional[str] = None  # Only kept when GEMINI_DEBUG=1
     
     def to_dict(self) -> dict:
         return {
@@ -124,36 +166,108 @@ class GeminiVisionService:
     Uses Google's Gemini API which has a generous free tier.
     """
     
+    # Concurrent API calls allowed per key, unless GEMINI_KEY_CONCURRENCY is set
+    DEFAULT_KEY_CONCURRENCY = 8
+    
+    # Number of completed analyses kept when GEMINI_CACHE=1
+    RESULT_CACHE_SIZE = 256
+    
+    # Largest image accepted, same limit as direct uploads
+    MAX_IMAGE_BYTES = settings.max_file_size_mb * 1024 * 1024
+    
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize the Gemini Vision service.
         
         Args:
-            api_key: Google Gemini API key. If not provided, reads from GEMINI_API_KEY env var.
+            api_key: Google Gemini API key. If not provided, reads a comma
+                separated pool from GEMINI_API_KEYS, or GEMINI_API_KEY.
         """
-        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if api_key:
+            self.api_keys = [api_key]
+        else:
+            self.api_keys = [
+                key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",")
+                if key.strip()
+            ] or [key for key in [os.getenv("GEMINI_API_KEY")] if key]
+        self.api_key = self.api_keys[0] if self.api_keys else None
+        # Requests rotate over the key pool; each key gets its own
+        # concurrency bound, and rate limited calls move on to the next key
+        self._key_cycle = itertools.cycle(range(len(self.api_keys)))
+        key_concurrency = int(
+            os.getenv("GEMINI_KEY_CONCURRENCY", self.DEFAULT_KEY_CONCURRENCY)
+        )
+        self._key_slots = [asyncio.Semaphore(key_concurrency) for _ in self.api_keys]
         self.api_base = "https://generativelanguage.googleapis.com/v1beta"
         self.model = "models/gemini-2.0-flash"  # Full model path with vision support
+        self.timeout = 60.0
+        # In-flight analyses keyed by image data, so concurrent requests for
+        # the same image share one API call
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # Completed analyses keyed by image content hash, opt-in because
+        # re-analysing an image can give a different answer
+        self._cache_enabled = os.getenv("GEMINI_CACHE") == "1"
+        self._results: "OrderedDict[bytes, GeminiAnalysisResult]" = OrderedDict()
+        # The model's raw text is only worth its memory when debugging
+        self._keep_raw_response = os.getenv("GEMINI_DEBUG") == "1"
         
     def is_configured(self) -> bool:
         """Check if the service is properly configured with an API key."""
         return bool(self.api_key)
 
+    async def prewarm(self) -> None:
+        """
+        Open a connection to the Gemini API ahead of the first analysis.
+        
+        The DNS lookup and TLS handshake then happen at startup rather than
+        on the first request. Failures are ignored; the first analysis will
+        simply connect itself.
+        """
+        try:
+            await get_client().get(self.api_base, timeout=5.0)
+        except httpx.HTTPError as e:
+            logger.warning("Gemini connection prewarm failed: %s", e)
+    
+    def check_image_size(self, image_base64: str) -> None:
+        """
+        Reject images over the size limit using only the base64 length.
+        
+        Args:
+            image_base64: Base64 payload (data URI prefix already removed)
+            
+        Raises:
+            ValueError: If the decoded image would exceed MAX_IMAGE_BYTES
+        """
+        size = decoded_length(image_base64)
+        if size > self.MAX_IMAGE_BYTES:
+            raise ValueError(
+                f"Image size ({size / (1024 * 1024):.2f}MB) exceeds maximum "
+                f"allowed size ({settings.max_file_size_mb}MB)"
+            )
+    
     async def analyze_floor_plan(
         self, 
         image_base64: str,
+        image_type: Optional[str] = None
     ) -> GeminiAnalysisResult:
         """
         Analyze a floor plan image using Gemini Vision.
         
+        Concurrent calls with the same image are coalesced into a single
+        API request and share its result. With GEMINI_CACHE=1, results with
+        at least one room are also kept in an LRU cache keyed by image
+        content hash.
+        
         Args:
             image_base64: Base64 encoded image data
+            image_type: Image subtype (e.g. "png") if the caller already
+                decoded the data; detected from the base64 header otherwise
             
         Returns:
             GeminiAnalysisResult with detected rooms
             
         Raises:
-            ValueError: If API key is not configured
+            ValueError: If API key is not configured or the image is too large
             Exception: If API call fails
         """
         if not self.is_configured():
@@ -163,14 +277,62 @@ class GeminiVisionService:
             )
         
         # Remove data URL prefix if present
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
+        image_base64 = strip_data_uri(image_base64)
+        self.check_image_size(image_base64)
+        
+        cache_key = None
+        if self._cache_enabled:
+            cache_key = hashlib.blake2b(image_base64.encode(), digest_size=16).digest()
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                self._results.move_to_end(cache_key)
+                return cached
         
+        task = self._in_flight.get(image_base64)
+        if task is None:
+            task = asyncio.ensure_future(self._analyze(image_base64, image_type))
+            self._in_flight[image_base64] = task
+            task.add_done_callback(
+                functools.partial(self._finish_in_flight, image_base64)
+            )
+        
+        # Shielded so one caller disconnecting does not cancel the others
+        result = await asyncio.shield(task)
+        
+        # An empty result usually means an unparseable reply; keep it out
+        # of the cache so the next request retries instead of replaying it
+        if cache_key is not None and result.rooms:
+            self._results[cache_key] = result
+            self._results.move_to_end(cache_key)
+            if len(self._results) > self.RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        
+        return result
+    
+    def _finish_in_flight(self, image_base64: str, task: asyncio.Task) -> None:
+        """
+        Done callback of a coalesced analysis task.
+        
+        Retrieves the task's exception so it is not logged as "never
+        retrieved" when every awaiting caller was cancelled; callers that
+        are still awaiting get it re-raised by the shield as before.
+        """
+        self._in_flight.pop(image_base64, None)
+        if not task.cancelled():
+            task.exception()
+    
+    async def _analyze(
+        self,
+        image_base64: str,
+        image_type: Optional[str]
+    ) -> GeminiAnalysisResult:
+        """Send one analysis request to the Gemini API."""
         # Detect image type
-        image_type = self._detect_image_type(image_base64)
+        if image_type is None:
+            image_type = self._detect_image_type(image_base64)
         
         # Prepare the API request
-        url = f"{self.api_base}/{self.model}:generateContent?key={self.api_key}"
+        url = f"{self.api_base}/{self.model}:generateContent"
         
         payload = {
             "contents": [
@@ -192,15 +354,31 @@ class GeminiVisionService:
             }
         }
         
-        # Make the API call
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=payload)
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                raise Exception(f"Gemini API error: {response.status_code} - {error_detail}")
-            
-            result = response.json()
+        # Make the API call, trying each key at most once on rate limits.
+        # Retries walk the pool from this request's first key rather than
+        # the shared cycle, which other requests may have moved back onto
+        # the key that just returned 429.
+        client = get_client()
+        content = orjson.dumps(payload)
+        first = next(self._key_cycle)
+        for attempt in range(len(self.api_keys)):
+            index = (first + attempt) % len(self.api_keys)
+            async with self._key_slots[index]:
+                response = await client.post(
+                    url,
+                    params={"key": self.api_keys[index]},
+                    headers={"Content-Type": "application/json"},
+                    content=content,
+                    timeout=self.timeout
+                )
+            if response.status_code != 429:
+                break
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            raise Exception(f"Gemini API error: {response.status_code} - {error_detail}")
+        
+        result = orjson.loads(response.content)
         
         # Extract the response content
         try:
@@ -213,33 +391,23 @@ class GeminiVisionService:
     
     def _detect_image_type(self, base64_data: str) -> str:
         """Detect image type from base64 data."""
-        try:
-            header = base64.b64decode(base64_data[:32])
-            if header[:8] == b'\x89PNG\r\n\x1a\n':
-                return "png"
-            elif header[:2] == b'\xff\xd8':
-                return "jpeg"
-            elif header[:6] in (b'GIF87a', b'GIF89a'):
-                return "gif"
-            elif header[:4] == b'RIFF' and header[8:12] == b'WEBP':
-                return "webp"
-        except:
-            pass
-        return "jpeg"
+        return detect_base64_image_type(base64_data)
     
     def _parse_response(self, raw_response: str) -> GeminiAnalysisResult:
         """Parse the Gemini response into structured data."""
         json_str = self._extract_json(raw_response)
+        kept_response = raw_response if self._keep_raw_response else None
         
         try:
-            data = json.loads(json_str)
-        except json.JSONDecodeError:
+            data = orjson.loads(json_str)
+        except orjson.JSONDecodeError:
+            logger.warning("Gemini response is not valid JSON: %.200s", raw_response)
             return GeminiAnalysisResult(
                 rooms=[],
                 total_rooms=0,
                 has_scale=False,
                 scale_info=None,
-                raw_response=raw_response
+                raw_response=kept_response
             )
         
         rooms = []
@@ -255,7 +423,7 @@ class GeminiVisionService:
                 )
                 rooms.append(room)
             except Exception as e:
-                print(f"Warning: Failed to parse room {i}: {e}")
+                logger.warning("Failed to parse room %d: %s", i, e)
                 continue
         
         return GeminiAnalysisResult(
@@ -263,38 +431,16 @@ class GeminiVisionService:
             total_rooms=data.get("total_rooms", len(rooms)),
             has_scale=data.get("has_scale", False),
             scale_info=data.get("scale_info"),
-            raw_response=raw_response
+            raw_response=kept_response
         )
     
     def _extract_json(self, text: str) -> str:
         """Extract JSON from text that may contain markdown code blocks."""
-        import re
-        
-        json_match = re.search(r'```(?:json)?\s*\n?([\s\S]*?)\n?```', text)
-        if json_match:
-            return json_match.group(1).strip()
-        
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if json_match:
-            return json_match.group(0)
-        
-        return text
+        return extract_json_text(text)
     
     def _parse_room_type(self, type_str: str) -> RoomType:
         """Parse room type string to enum."""
-        type_map = {
-            "living": RoomType.LIVING,
-            "bedroom": RoomType.BEDROOM,
-            "kitchen": RoomType.KITCHEN,
-            "bathroom": RoomType.BATHROOM,
-            "balcony": RoomType.BALCONY,
-            "dining": RoomType.DINING,
-            "study": RoomType.STUDY,
-            "storage": RoomType.STORAGE,
-            "hallway": RoomType.HALLWAY,
-            "other": RoomType.OTHER,
-        }
-        return type_map.get(type_str.lower(), RoomType.OTHER)
+        return _ROOM_TYPE_MAP.get(type_str.lower(), RoomType.OTHER)
 
 
 def convert_to_homedata_rooms(
@@ -304,45 +450,34 @@ def convert_to_homedata_rooms(
     pixels_per_meter: float = 50.0
 ) -> List[Dict[str, Any]]:
     """Convert Gemini result to homeData room format."""
-    color_map = {
-        RoomType.LIVING: "#E8D4B8",
-        RoomType.BEDROOM: "#B8D4E8",
-        RoomType.KITCHEN: "#D4E8B8",
-        RoomType.BATHROOM: "#E8B8D4",
-        RoomType.BALCONY: "#D4B8E8",
-        RoomType.DINING: "#E8E8B8",
-        RoomType.STUDY: "#B8E8D4",
-        RoomType.STORAGE: "#D4D4D4",
-        RoomType.HALLWAY: "#E8E8E8",
-        RoomType.OTHER: "#C8C8C8",
-    }
-    
     rooms = []
-    center_x = image_width / 2
-    center_y = image_height / 2
+    if not gemini_result.rooms:
+        return rooms
     
-    for room in gemini_result.rooms:
-        px_x = (room.bounds["x"] / 100) * image_width
-        px_y = (room.bounds["y"] / 100) * image_height
-        px_width = (room.bounds["width"] / 100) * image_width
-        px_height = (room.bounds["height"] / 100) * image_height
-        
-        room_center_px_x = px_x + px_width / 2
-        room_center_px_y = px_y + px_height / 2
-        
-        pos_x = (room_center_px_x - center_x) / pixels_per_meter
-        pos_z = (room_center_px_y - center_y) / pixels_per_meter
-        
-        width = px_width / pixels_per_meter
-        depth = px_height / pixels_per_meter
-        
+    # (K, 4) percentage bounds -> pixels, converted for all rooms at once
+    bounds = np.array(
+        [
+            (r.bounds["x"], r.bounds["y"], r.bounds["width"], r.bounds["height"])
+            for r in gemini_result.rooms
+        ],
+        dtype=np.float64
+    )
+    px = bounds / 100 * np.array([image_width, image_height, image_width, image_height])
+    
+    centers_px = px[:, :2] + px[:, 2:] / 2
+    positions = (centers_px - (image_width / 2, image_height / 2)) / pixels_per_meter
+    sizes = px[:, 2:] / pixels_per_meter
+    
+    for room, (pos_x, pos_z), (width, depth) in zip(
+        gemini_result.rooms, positions.tolist(), sizes.tolist()
+    ):
         rooms.append({
             "id": room.id,
             "name": room.name,
             "type": room.type.value,
             "position": {"x": round(pos_x, 2), "y": 0, "z": round(pos_z, 2)},
             "size": {"width": round(width, 2), "height": 3, "depth": round(depth, 2)},
-            "color": color_map.get(room.type, "#C8C8C8"),
+            "color": _ROOM_TYPE_COLORS.get(room.type, "#C8C8C8"),
             "devices": []
         })
     
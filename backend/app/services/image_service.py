@@ -1,15 +1,32 @@
 """
 Image processing service
 """
-import base64
+import hashlib
 import io
+import math
 import re
+import struct
+import threading
 import uuid
+from collections import OrderedDict
 from typing import Tuple, Optional
+import cv2
+import numpy as np
 from PIL import Image
+import pybase64 as base64
 
+from app.core.base64_utils import DATA_URI_HEADER_MAX_LENGTH, decoded_length
+from app.core.executor import run_in_executor
 from app.core.config import settings
 
+# Optional libjpeg-turbo decoder for JPEG uploads; falls back to cv2.imdecode
+# when PyTurboJPEG or the native library is not installed.
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    turbo = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo = None
+
 
 class ImageValidationError(Exception):
     """Custom exception for image validation errors"""
@@ -25,9 +42,26 @@ class ImageService:
     # Allowed image formats
     ALLOWED_FORMATS = {"PNG", "JPEG", "JPG"}
     
-    # Data URI pattern
-    DATA_URI_PATTERN = re.compile(
-        r'^data:image/(?P<format>\w+);base64,(?P<data>.+)$',
+    # Decode to 3-channel BGR like ImagePreprocessor.pil_to_cv2, without
+    # applying EXIF orientation (PIL does not apply it either)
+    IMDECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    
+    # Recently decoded arrays keyed by content hash. The frontend usually
+    # posts the same image to /detect-walls and /detect-rooms back to back.
+    # Bounded by decoded size, since a small JPEG can decode to tens of MB.
+    DECODE_CACHE_MAX_BYTES = 80 * 1024 * 1024
+    _decode_cache: "OrderedDict[bytes, Tuple[np.ndarray, str]]" = OrderedDict()
+    _decode_cache_bytes = 0
+    _decode_cache_lock = threading.Lock()
+    
+    # JPEG start-of-frame markers, whose segment carries the image size
+    # (every SOFn except DHT 0xC4, JPG 0xC8 and DAC 0xCC)
+    JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+    
+    # Data URI header pattern (matched against the prefix only, so the
+    # base64 payload itself is never scanned or copied by the regex)
+    DATA_URI_HEADER_PATTERN = re.compile(
+        r'^data:image/(?P<format>\w+);base64$',
         re.IGNORECASE
     )
     
@@ -43,20 +77,24 @@ class ImageService:
             Tuple of (image_bytes, detected_format)
             
         Raises:
-            ImageValidationError: If decoding fails
+            ImageValidationError: If decoding fails or the image is too large
         """
         detected_format = None
         
         # Check for data URI format
-        match = cls.DATA_URI_PATTERN.match(base64_string)
-        if match:
-            detected_format = match.group("format").upper()
-            base64_data = match.group("data")
-        else:
-            base64_data = base64_string
+        base64_data = base64_string
+        separator = base64_string.find(",", 0, DATA_URI_HEADER_MAX_LENGTH)
+        if separator >= 0:
+            match = cls.DATA_URI_HEADER_PATTERN.match(base64_string[:separator])
+            if match:
+                detected_format = match.group("format").upper()
+                base64_data = base64_string[separator + 1:]
+        
+        # Reject oversize payloads before allocating the decoded bytes
+        cls.validate_encoded_size(base64_data)
         
         try:
-            image_bytes = base64.b64decode(base64_data)
+            image_bytes = base64.b64decode(base64_data, validate=True)
         except Exception as e:
             raise ImageValidationError(f"Invalid base64 encoding: {str(e)}")
         
@@ -73,7 +111,32 @@ class ImageService:
         Raises:
             ImageValidationError: If file exceeds size limit
         """
-        size = len(image_bytes)
+        cls.check_size(len(image_bytes))
+    
+    @classmethod
+    def validate_encoded_size(cls, base64_data: str) -> None:
+        """
+        Validate image file size from its base64 encoding, without decoding.
+        
+        Args:
+            base64_data: Base64 payload (data URI prefix already removed)
+            
+        Raises:
+            ImageValidationError: If the decoded size would exceed the limit
+        """
+        cls.check_size(decoded_length(base64_data))
+    
+    @classmethod
+    def check_size(cls, size: int) -> None:
+        """
+        Validate an image size given in bytes.
+        
+        Args:
+            size: Image size in bytes
+            
+        Raises:
+            ImageValidationError: If the size exceeds the limit
+        """
         if size > cls.MAX_SIZE_BYTES:
             max_mb = settings.max_file_size_mb
             actual_mb = size / (1024 * 1024)
@@ -100,8 +163,13 @@ class ImageService:
         Raises:
             ImageValidationError: If format is not supported
         """
+        # Known signatures skip PIL's probing of every registered format
+        sniffed = cls.sniff_format(image_bytes)
         try:
-            image = Image.open(io.BytesIO(image_bytes))
+            image = Image.open(
+                io.BytesIO(image_bytes),
+                formats=[sniffed] if sniffed else None
+            )
             image_format = image.format
         except Exception as e:
             raise ImageValidationError(f"Cannot read image: {str(e)}")
@@ -128,11 +196,133 @@ class ImageService:
         
         return image, image_format
     
+    @staticmethod
+    def sniff_format(image_bytes: bytes) -> Optional[str]:
+        """
+        Identify an allowed format from its magic bytes.
+        
+        Args:
+            image_bytes: Raw image bytes (the first 8 bytes are enough)
+            
+        Returns:
+            "PNG" or "JPEG", or None for anything else
+        """
+        if image_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+            return "PNG"
+        if image_bytes[:3] == b"\xff\xd8\xff":
+            return "JPEG"
+        return None
+    
+    @classmethod
+    def probe_header(cls, image_bytes: bytes) -> Optional[Tuple[str, int, int]]:
+        """
+        Read format and dimensions from a PNG or JPEG header.
+        
+        PNG stores the size at fixed offsets in IHDR; for JPEG the marker
+        segments are walked by their length fields up to the first SOF
+        segment, so the entropy-coded data is never touched.
+        
+        Args:
+            image_bytes: Raw image bytes
+            
+        Returns:
+            Tuple of (format, width, height), or None if the header is not
+            a PNG or JPEG header this parser understands
+        """
+        image_format = cls.sniff_format(image_bytes)
+        
+        if image_format == "PNG":
+            if image_bytes[12:16] != b"IHDR" or len(image_bytes) < 24:
+                return None
+            width, height = struct.unpack_from(">II", image_bytes, 16)
+            return "PNG", width, height
+        
+        if image_format != "JPEG":
+            return None
+        
+        offset = 2
+        end = len(image_bytes)
+        while offset + 4 <= end:
+            if image_bytes[offset] != 0xFF:
+                return None
+            marker = image_bytes[offset + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                offset += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                # Standalone markers have no length field
+                offset += 2
+                continue
+            if marker in cls.JPEG_SOF_MARKERS:
+                if offset + 9 > end:
+                    return None
+                height, width = struct.unpack_from(">HH", image_bytes, offset + 5)
+                return "JPEG", width, height
+            if marker in (0xD9, 0xDA):
+                # End of image or start of scan before any frame header
+                return None
+            (length,) = struct.unpack_from(">H", image_bytes, offset + 2)
+            offset += 2 + length
+        
+        return None
+    
+    @classmethod
+    def probe_image_format(
+        cls,
+        image_bytes: bytes,
+        filename: Optional[str] = None
+    ) -> Tuple[str, int, int]:
+        """
+        Validate image format and return its dimensions without a PIL Image.
+        
+        Falls back to validate_image_format when the header probe cannot
+        identify the image.
+        
+        Args:
+            image_bytes: Raw image bytes
+            filename: Optional filename for format hint
+            
+        Returns:
+            Tuple of (format string, width, height)
+            
+        Raises:
+            ImageValidationError: If format is not supported
+        """
+        probed = cls.probe_header(image_bytes)
+        if probed is not None:
+            return probed
+        
+        image, image_format = cls.validate_image_format(image_bytes, filename)
+        return image_format, image.width, image.height
+    
+    @staticmethod
+    def draft_to_fit(image: Image.Image, max_dimension: int) -> None:
+        """
+        Let the JPEG decoder downscale an oversize image while decoding.
+        
+        Image.draft picks the largest DCT scale (1/2, 1/4 or 1/8) that keeps
+        the image at least as large as requested, so the long side still
+        covers max_dimension and the preprocessor does the final resize.
+        The draft decodes straight to grayscale, which is all the pipeline
+        uses. Has no effect on other formats or on smaller images.
+        
+        Args:
+            image: Image returned by Image.open, not yet loaded
+            max_dimension: Long side needed by the consumer
+        """
+        if image.format != "JPEG" or max(image.size) <= max_dimension:
+            return
+        
+        scale = max_dimension / max(image.size)
+        image.draft("L", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+    
     @classmethod
     def process_upload(
         cls,
         base64_image: str,
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        max_dimension: Optional[int] = None
     ) -> dict:
         """
         Process an uploaded base64 image.
@@ -140,9 +330,12 @@ class ImageService:
         Args:
             base64_image: Base64 encoded image string
             filename: Optional original filename
+            max_dimension: If set, large JPEGs are decoded at a reduced
+                size that still covers this many pixels on the long side
             
         Returns:
-            Dictionary with image info
+            Dictionary with image info; width, height and original_size
+            are those of the upload even when "image" was drafted smaller
             
         Raises:
             ImageValidationError: If validation fails
@@ -150,19 +343,232 @@ class ImageService:
         # Decode base64
         image_bytes, uri_format = cls.decode_base64_image(base64_image)
         
+        return cls.process_upload_bytes(image_bytes, filename, max_dimension)
+    
+    @classmethod
+    async def process_upload_async(
+        cls,
+        base64_image: str,
+        filename: Optional[str] = None,
+        max_dimension: Optional[int] = None
+    ) -> dict:
+        """
+        Run process_upload on the shared pipeline executor.
+        
+        Base64 decoding and header parsing stay off the event loop, and the
+        executor's CPU-sized pool bounds how many uploads decode at once.
+        """
+        return await run_in_executor(cls.process_upload, base64_image, filename, max_dimension)
+    
+    @classmethod
+    def inspect_upload(
+        cls,
+        base64_image: str,
+        filename: Optional[str] = None
+    ) -> dict:
+        """
+        Validate an uploaded base64 image and report its metadata.
+        
+        Like process_upload, but the format and size come from the header
+        probe and no PIL Image is built, for callers that never need the
+        pixels.
+        
+        Args:
+            base64_image: Base64 encoded image string
+            filename: Optional original filename
+            
+        Returns:
+            Dictionary with image info, without "image"
+            
+        Raises:
+            ImageValidationError: If validation fails
+        """
+        image_bytes, uri_format = cls.decode_base64_image(base64_image)
+        
+        return cls.inspect_upload_bytes(image_bytes, filename)
+    
+    @classmethod
+    def inspect_upload_bytes(
+        cls,
+        image_bytes: bytes,
+        filename: Optional[str] = None
+    ) -> dict:
+        """
+        Validate raw uploaded image bytes and report their metadata.
+        
+        Args:
+            image_bytes: Raw image bytes
+            filename: Optional original filename
+            
+        Returns:
+            Dictionary with image info, without "image"
+            
+        Raises:
+            ImageValidationError: If validation fails
+        """
+        cls.validate_image_size(image_bytes)
+        
+        image_format, width, height = cls.probe_image_format(image_bytes, filename)
+        
+        return {
+            "image_id": str(uuid.uuid4()),
+            "width": width,
+            "height": height,
+            "format": image_format,
+            "size_bytes": len(image_bytes),
+            "image_bytes": image_bytes
+        }
+    
+    @classmethod
+    def process_upload_bytes(
+        cls,
+        image_bytes: bytes,
+        filename: Optional[str] = None,
+        max_dimension: Optional[int] = None
+    ) -> dict:
+        """
+        Process an uploaded image from raw bytes (e.g. a multipart file part).
+        
+        Args:
+            image_bytes: Raw image bytes
+            filename: Optional original filename
+            max_dimension: If set, large JPEGs are decoded at a reduced
+                size that still covers this many pixels on the long side
+            
+        Returns:
+            Dictionary with image info; width, height and original_size
+            are those of the upload even when "image" was drafted smaller
+            
+        Raises:
+            ImageValidationError: If validation fails
+        """
         # Validate size
         cls.validate_image_size(image_bytes)
         
         # Validate format and get image
         image, image_format = cls.validate_image_format(image_bytes, filename)
         
+        # Size of the upload itself; a draft below shrinks image.size
+        original_size = image.size
+        
+        if max_dimension is not None:
+            cls.draft_to_fit(image, max_dimension)
+        
         # Generate unique ID
         image_id = str(uuid.uuid4())
         
         return {
             "image_id": image_id,
-            "width": image.width,
-            "height": image.height,
+            "width": original_size[0],
+            "height": original_size[1],
+            "original_size": original_size,
+            "format": image_format,
+            "size_bytes": len(image_bytes),
+            "image": image,
+            "image_bytes": image_bytes
+        }
+    
+    @classmethod
+    def decode_pixels(cls, image_bytes: bytes, image_format: str) -> np.ndarray:
+        """
+        Decode image bytes into a 3-channel BGR array.
+        
+        JPEGs go through libjpeg-turbo when it is available; everything
+        else, and JPEGs it rejects, is decoded with cv2.imdecode.
+        
+        Args:
+            image_bytes: Raw image bytes
+            image_format: Validated format string
+            
+        Returns:
+            BGR numpy array
+            
+        Raises:
+            ImageValidationError: If decoding fails
+        """
+        if turbo is not None and image_format == "JPEG":
+            try:
+                return turbo.decode(image_bytes, pixel_format=TJPF_BGR)
+            except OSError:
+                pass  # Let OpenCV try (and report) the broken JPEG
+        
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cls.IMDECODE_FLAGS)
+        if image is None:
+            raise ImageValidationError("Cannot read image: decoding failed")
+        return image
+    
+    @classmethod
+    def _cache_decoded(cls, cache_key: bytes, image: np.ndarray, image_format: str) -> None:
+        """
+        Add a decoded array to the decode cache, evicting the least recently
+        used entries until the cache fits DECODE_CACHE_MAX_BYTES again.
+        Arrays larger than the whole budget are not cached.
+        """
+        if image.nbytes > cls.DECODE_CACHE_MAX_BYTES:
+            return
+        
+        with cls._decode_cache_lock:
+            if cache_key in cls._decode_cache:
+                return
+            cls._decode_cache[cache_key] = (image, image_format)
+            cls._decode_cache_bytes += image.nbytes
+            while cls._decode_cache_bytes > cls.DECODE_CACHE_MAX_BYTES:
+                _, (evicted, _) = cls._decode_cache.popitem(last=False)
+                cls._decode_cache_bytes -= evicted.nbytes
+    
+    @classmethod
+    def process_upload_ndarray(
+        cls,
+        base64_image: str,
+        filename: Optional[str] = None
+    ) -> dict:
+        """
+        Process an uploaded base64 image into an OpenCV array.
+        
+        The format is validated from the image header only; the pixels are
+        decoded once by decode_pixels straight into a BGR array, skipping
+        the PIL image and the PIL to OpenCV conversion copy. Recent results
+        are cached by content hash, so repeated uploads of the same image
+        skip decoding; the returned array is read-only.
+        
+        Args:
+            base64_image: Base64 encoded image string
+            filename: Optional original filename
+            
+        Returns:
+            Dictionary with image info; "image" is a BGR numpy array
+            
+        Raises:
+            ImageValidationError: If validation or decoding fails
+        """
+        image_bytes, uri_format = cls.decode_base64_image(base64_image)
+        
+        cls.validate_image_size(image_bytes)
+        
+        cache_key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        with cls._decode_cache_lock:
+            cached = cls._decode_cache.get(cache_key)
+            if cached is not None:
+                cls._decode_cache.move_to_end(cache_key)
+        
+        if cached is not None:
+            image, image_format = cached
+        else:
+            # Only the header is parsed here, the pixels are decoded below
+            image_format, _, _ = cls.probe_image_format(image_bytes, filename)
+            
+            image = cls.decode_pixels(image_bytes, image_format)
+            
+            # Cached arrays are shared between requests
+            image.flags.writeable = False
+            cls._cache_decoded(cache_key, image, image_format)
+        
+        height, width = image.shape[:2]
+        
+        return {
+            "image_id": str(uuid.uuid4()),
+            "width": width,
+            "height": height,
             "format": image_format,
             "size_bytes": len(image_bytes),
             "image": image,
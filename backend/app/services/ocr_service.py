@@ -7,13 +7,53 @@ Requirements covered:
 - 5.3: Associate labels with their nearest room
 - 5.4: Assign default name based on size/position when no label detected
 """
+import functools
+import logging
+import math
+import os
+import re
+import threading
+
+# Tesseract's OpenMP threads oversubscribe the cores when several OCR calls
+# run in parallel (executor workers, uvicorn workers); one thread per call
+# is faster overall. Must be set before tesseract is spawned.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 import cv2
 import numpy as np
 import pytesseract
-from typing import List, Tuple, Optional, Dict
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple, Optional, Dict, Union
 from dataclasses import dataclass
 from enum import Enum
 
+# Optional Aho-Corasick automaton for room keyword matching; falls back to
+# one regex alternation per room type when pyahocorasick is not installed.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional in-process Tesseract binding; pytesseract spawns a tesseract
+# process (and reloads the language models) on every call.
+try:
+    from tesserocr import PyTessBaseAPI, PSM, OEM, RIL, iterate_level
+except ImportError:
+    PyTessBaseAPI = None
+
+# Optional Hungarian solver for globally optimal label-room matching; falls
+# back to greedy nearest-label matching when SciPy is not installed. Unlike
+# the other optional imports this changes results, not just speed: the two
+# matchers can assign labels differently (see LabelAssociator).
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+logger = logging.getLogger(__name__)
+
 
 class RoomType(Enum):
     """Room type classification based on detected labels"""
@@ -29,7 +69,7 @@ class RoomType(Enum):
     OTHER = "other"
 
 
-@dataclass
+@dataclass(slots=True)
 class TextLabel:
     """Represents a detected text label in the floor plan"""
     text: str
@@ -51,7 +91,83 @@ class TextLabel:
         }
 
 
-@dataclass
+@dataclass(slots=True)
+class TextLabelBatch:
+    """
+    Detected text labels as parallel arrays, one row per label.
+    
+    OCR output and label association work on this form; TextLabel
+    objects are only built for results that are returned. Iterating or
+    indexing a batch yields TextLabel objects, like a list of labels.
+    """
+    texts: List[str]
+    boxes: np.ndarray  # (N, 4) int32 x, y, width, height
+    centers: np.ndarray  # (N, 2) float64 x, y center positions
+    confidences: np.ndarray  # (N,) float64 OCR confidence 0-100
+    room_types: List[Optional[RoomType]]
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def __iter__(self) -> Iterator[TextLabel]:
+        return iter(self.to_labels())
+    
+    def __getitem__(self, index: int) -> TextLabel:
+        return self.label(index)
+    
+    @classmethod
+    def from_labels(cls, labels: List[TextLabel]) -> "TextLabelBatch":
+        """Build a batch from TextLabel objects."""
+        return cls(
+            texts=[label.text for label in labels],
+            boxes=np.array(
+                [(*label.position, *label.size) for label in labels],
+                dtype=np.int32
+            ).reshape(-1, 4),
+            centers=np.array(
+                [label.center for label in labels], dtype=np.float64
+            ).reshape(-1, 2),
+            confidences=np.array(
+                [label.confidence for label in labels], dtype=np.float64
+            ),
+            room_types=[label.room_type for label in labels]
+        )
+    
+    def label(self, index: int) -> TextLabel:
+        """Build the TextLabel for one row."""
+        x, y, w, h = self.boxes[index].tolist()
+        center_x, center_y = self.centers[index].tolist()
+        return TextLabel(
+            text=self.texts[index],
+            position=(x, y),
+            size=(w, h),
+            confidence=float(self.confidences[index]),
+            center=(center_x, center_y),
+            room_type=self.room_types[index]
+        )
+    
+    def to_labels(self) -> List[TextLabel]:
+        """Build TextLabel objects for every row."""
+        return [
+            TextLabel(
+                text=text,
+                position=(x, y),
+                size=(w, h),
+                confidence=confidence,
+                center=(center_x, center_y),
+                room_type=room_type
+            )
+            for text, (x, y, w, h), (center_x, center_y), confidence, room_type in zip(
+                self.texts,
+                self.boxes.tolist(),
+                self.centers.tolist(),
+                self.confidences.tolist(),
+                self.room_types
+            )
+        ]
+
+
+@dataclass(slots=True)
 class RoomLabelAssociation:
     """Association between a room and its detected label"""
     room_id: str
@@ -73,10 +189,10 @@ class RoomLabelAssociation:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class OCRResult:
     """Result of OCR text detection"""
-    labels: List[TextLabel]
+    labels: Union[List[TextLabel], TextLabelBatch]  # TextLabelBatch from detect_text
     image_size: Tuple[int, int]  # (width, height)
     language: str  # OCR language used
     
@@ -94,9 +210,10 @@ class OCRConfig:
     """Configuration for OCR parameters"""
     
     # Tesseract configuration
-    # OEM 3 = Default, based on what is available
+    # OEM 1 = LSTM engine only (skips the legacy engine probe; the
+    #         standard tessdata models are LSTM anyway)
     # PSM 11 = Sparse text. Find as much text as possible in no particular order
-    TESSERACT_CONFIG = r'--oem 3 --psm 11'
+    TESSERACT_CONFIG = r'--oem 1 --psm 11'
     
     # Language configuration (Chinese Simplified + English)
     DEFAULT_LANGUAGE = 'chi_sim+eng'
@@ -112,6 +229,10 @@ class OCRConfig:
     # Preprocessing for OCR
     BINARY_THRESHOLD = 180  # Threshold for binarization
     MORPH_KERNEL_SIZE = 2  # Kernel size for morphological operations
+    
+    # Larger images are downscaled before OCR; Tesseract time grows with
+    # pixel count and room labels stay legible at this size
+    MAX_OCR_DIMENSION = 1600
 
 
 # Room type keywords mapping (Chinese and English)
@@ -162,6 +283,78 @@ DEFAULT_ROOM_NAMES: Dict[RoomType, str] = {
 }
 
 
+# Lowercase keywords of each room type joined into one string, in priority
+# order, for the "text is part of a keyword" check. OCR text never contains
+# the NUL separator, so a match cannot span two keywords.
+ROOM_TYPE_KEYWORD_TEXT: List[Tuple[RoomType, str]] = [
+    (room_type, "\0".join(keyword.lower() for keyword in keywords))
+    for room_type, keywords in ROOM_TYPE_KEYWORDS.items()
+]
+
+# One literal alternation per room type, in priority order, for the
+# "keyword is in the text" check when pyahocorasick is not installed
+ROOM_TYPE_KEYWORD_PATTERNS: List[Tuple[RoomType, "re.Pattern[str]", str]] = [
+    (
+        room_type,
+        re.compile("|".join(re.escape(keyword.lower()) for keyword in keywords)),
+        keyword_text
+    )
+    for (room_type, keywords), (_, keyword_text) in zip(
+        ROOM_TYPE_KEYWORDS.items(), ROOM_TYPE_KEYWORD_TEXT
+    )
+]
+
+
+def build_keyword_automaton():
+    """
+    Build an Aho-Corasick automaton over all room keywords.
+    
+    Each keyword maps to (priority, RoomType), where priority is the
+    position of its room type in ROOM_TYPE_KEYWORDS.
+    """
+    automaton = ahocorasick.Automaton()
+    for priority, (room_type, keywords) in enumerate(ROOM_TYPE_KEYWORDS.items()):
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if keyword not in automaton:
+                automaton.add_word(keyword, (priority, room_type))
+    automaton.make_automaton()
+    return automaton
+
+
+KEYWORD_AUTOMATON = build_keyword_automaton() if ahocorasick is not None else None
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify_text(text: str) -> Optional[RoomType]:
+    """
+    Room type for a piece of OCR text, by keyword.
+    
+    A pure function of the text, cached because the same labels
+    ("卧室", "卫生间", ...) recur many times within and across plans.
+    """
+    text_lower = text.lower()
+    
+    if KEYWORD_AUTOMATON is not None:
+        # One pass finds every keyword in the text; the first room type
+        # (in priority order) with a keyword in the text or containing
+        # the text wins, as in the per-type loop below
+        found = min(
+            (priority for _, (priority, _) in KEYWORD_AUTOMATON.iter(text_lower)),
+            default=len(ROOM_TYPE_KEYWORD_TEXT)
+        )
+        for priority, (room_type, keyword_text) in enumerate(ROOM_TYPE_KEYWORD_TEXT):
+            if priority == found or text_lower in keyword_text:
+                return room_type
+        return None
+    
+    for room_type, pattern, keyword_text in ROOM_TYPE_KEYWORD_PATTERNS:
+        if pattern.search(text_lower) or text_lower in keyword_text:
+            return room_type
+    
+    return None
+
+
 class OCRService:
     """
     OCR service for detecting and extracting text labels from floor plans.
@@ -175,14 +368,25 @@ class OCRService:
     
     def __init__(self, config: Optional[OCRConfig] = None):
         self.config = config or OCRConfig()
+        # tesserocr API handles are not thread safe, so each executor
+        # thread keeps its own, one per language
+        self._tess_apis = threading.local()
+        self._morph_kernel = cv2.getStructuringElement(
+            cv2.MORPH_RECT,
+            (self.config.MORPH_KERNEL_SIZE, self.config.MORPH_KERNEL_SIZE)
+        )
+        # pytesseract config strings, one per language
+        self._tess_configs: Dict[str, str] = {}
         self._check_tesseract()
     
     def _check_tesseract(self) -> None:
         """Check if Tesseract is available"""
+        if PyTessBaseAPI is not None:
+            return
         try:
             pytesseract.get_tesseract_version()
         except Exception as e:
-            print(f"Warning: Tesseract OCR may not be properly installed: {e}")
+            logger.warning("Tesseract OCR may not be properly installed: %s", e)
 
     def detect_text(
         self, 
@@ -204,21 +408,30 @@ class OCRService:
         height, width = image.shape[:2]
         lang = language or self.config.DEFAULT_LANGUAGE
         
+        # Downscale large plans; label geometry is mapped back in _run_ocr
+        scale = min(1.0, self.config.MAX_OCR_DIMENSION / max(height, width))
+        if scale < 1.0:
+            image = cv2.resize(
+                image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+        
         # Preprocess image for better OCR
         processed = self._preprocess_for_ocr(image)
         
         # Try OCR with specified language
         try:
-            labels = self._run_ocr(processed, lang)
+            labels = self._run_ocr(processed, lang, scale)
         except Exception as e:
             # Fallback to English only if Chinese fails
-            print(f"OCR with {lang} failed: {e}, falling back to {self.config.FALLBACK_LANGUAGE}")
-            labels = self._run_ocr(processed, self.config.FALLBACK_LANGUAGE)
+            logger.warning(
+                "OCR with %s failed: %s, falling back to %s",
+                lang, e, self.config.FALLBACK_LANGUAGE
+            )
+            labels = self._run_ocr(processed, self.config.FALLBACK_LANGUAGE, scale)
             lang = self.config.FALLBACK_LANGUAGE
         
         # Infer room types for each label
-        for label in labels:
-            label.room_type = self._infer_room_type(label.text)
+        labels.room_types = [self._infer_room_type(text) for text in labels.texts]
         
         return OCRResult(
             labels=labels,
@@ -236,32 +449,32 @@ class OCRService:
         Returns:
             Preprocessed image optimized for OCR
         """
-        # Convert to grayscale if needed
+        # Convert to grayscale if needed; the input itself is never written
         if len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         else:
-            gray = image.copy()
+            gray = image
         
-        # Apply adaptive thresholding for better text contrast
-        binary = cv2.adaptiveThreshold(
+        # Global threshold: floor plan labels are dark text on a light
+        # background, so one cut-off suffices and costs a single pass
+        _, binary = cv2.threshold(
             gray,
+            self.config.BINARY_THRESHOLD,
             255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            11,
-            2
+            cv2.THRESH_BINARY
         )
         
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
+        # Remove isolated white specks inside strokes, in place
+        cv2.morphologyEx(binary, cv2.MORPH_OPEN, self._morph_kernel, dst=binary)
         
-        return denoised
+        return binary
     
     def _run_ocr(
         self, 
         image: np.ndarray, 
-        language: str
-    ) -> List[TextLabel]:
+        language: str,
+        scale: float = 1.0
+    ) -> TextLabelBatch:
         """
         Run Tesseract OCR on the image.
         
@@ -270,58 +483,105 @@ class OCRService:
         Args:
             image: Preprocessed image
             language: OCR language code
+            scale: Factor the image was downscaled by; label geometry is
+                returned in original image coordinates
             
         Returns:
-            List of detected TextLabel objects
+            TextLabelBatch of the detected labels
         """
-        config = f'{self.config.TESSERACT_CONFIG} -l {language}'
-        
         # Get detailed OCR data
-        data = pytesseract.image_to_data(
-            image, 
-            config=config,
-            output_type=pytesseract.Output.DICT
-        )
-        
-        labels = []
-        n_boxes = len(data['text'])
+        if PyTessBaseAPI is not None:
+            data = self._read_words_tesserocr(image, language)
+        else:
+            data = pytesseract.image_to_data(
+                image, 
+                config=self._config_for(language),
+                output_type=pytesseract.Output.DICT
+            )
         
-        for i in range(n_boxes):
-            text = data['text'][i].strip()
-            conf = float(data['conf'][i])
-            
-            # Filter by confidence and text length
-            if conf < self.config.MIN_CONFIDENCE:
-                continue
-            
-            if len(text) < self.config.MIN_TEXT_LENGTH:
-                continue
-            
-            if len(text) > self.config.MAX_TEXT_LENGTH:
-                continue
-            
-            # Skip pure numbers or single characters that aren't Chinese
-            if text.isdigit():
+        texts = [text.strip() for text in data['text']]
+        confidences = np.asarray(data['conf'], dtype=np.float64)
+        
+        # Filter by confidence and text length, and skip pure numbers
+        keep = [
+            i for i, text in enumerate(texts)
+            if confidences[i] >= self.config.MIN_CONFIDENCE
+            and self.config.MIN_TEXT_LENGTH <= len(text) <= self.config.MAX_TEXT_LENGTH
+            and not text.isdigit()
+        ]
+        
+        boxes = np.array(
+            [data['left'], data['top'], data['width'], data['height']],
+            dtype=np.int32
+        ).T[keep].reshape(-1, 4)
+        
+        # Calculate centers, then map everything back to original coordinates
+        centers = (boxes[:, :2] + boxes[:, 2:] / 2) / scale
+        if scale != 1.0:
+            boxes = np.round(boxes / scale).astype(boxes.dtype)
+        
+        return TextLabelBatch(
+            texts=[texts[i] for i in keep],
+            boxes=boxes,
+            centers=centers,
+            confidences=confidences[keep],
+            room_types=[None] * len(keep)
+        )
+    
+    def _config_for(self, language: str) -> str:
+        """Return the pytesseract config string for a language."""
+        config = self._tess_configs.get(language)
+        if config is None:
+            config = f'{self.config.TESSERACT_CONFIG} -l {language}'
+            self._tess_configs[language] = config
+        return config
+    
+    def _tess_api(self, language: str) -> "PyTessBaseAPI":
+        """Return this thread's tesserocr API for a language, creating it once."""
+        apis = getattr(self._tess_apis, "apis", None)
+        if apis is None:
+            apis = self._tess_apis.apis = {}
+        api = apis.get(language)
+        if api is None:
+            api = PyTessBaseAPI(
+                lang=language,
+                psm=PSM.SPARSE_TEXT,
+                oem=OEM.LSTM_ONLY
+            )
+            apis[language] = api
+        return api
+    
+    def _read_words_tesserocr(
+        self, 
+        image: np.ndarray, 
+        language: str
+    ) -> Dict[str, list]:
+        """
+        Run OCR through tesserocr and return word boxes in the same
+        layout as pytesseract.image_to_data(output_type=DICT).
+        """
+        api = self._tess_api(language)
+        api.SetImage(Image.fromarray(image))
+        api.Recognize()
+        
+        data = {'text': [], 'conf': [], 'left': [], 'top': [], 'width': [], 'height': []}
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+        
+        for word in iterate_level(iterator, RIL.WORD):
+            box = word.BoundingBox(RIL.WORD)
+            if box is None:
                 continue
-            
-            x = data['left'][i]
-            y = data['top'][i]
-            w = data['width'][i]
-            h = data['height'][i]
-            
-            # Calculate center
-            center_x = x + w / 2
-            center_y = y + h / 2
-            
-            labels.append(TextLabel(
-                text=text,
-                position=(x, y),
-                size=(w, h),
-                confidence=conf,
-                center=(center_x, center_y)
-            ))
-        
-        return labels
+            x1, y1, x2, y2 = box
+            data['text'].append(word.GetUTF8Text(RIL.WORD) or '')
+            data['conf'].append(word.Confidence(RIL.WORD))
+            data['left'].append(x1)
+            data['top'].append(y1)
+            data['width'].append(x2 - x1)
+            data['height'].append(y2 - y1)
+        
+        return data
     
     def _infer_room_type(self, text: str) -> Optional[RoomType]:
         """
@@ -335,14 +595,7 @@ class OCRService:
         Returns:
             Inferred RoomType or None if not recognized
         """
-        text_lower = text.lower()
-        
-        for room_type, keywords in ROOM_TYPE_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword.lower() in text_lower or text_lower in keyword.lower():
-                    return room_type
-        
-        return None
+        return _classify_text(text)
 
 
 class LabelAssociator:
@@ -353,15 +606,24 @@ class LabelAssociator:
     - Label-to-room matching based on proximity
     - Default name assignment for unlabeled rooms
     - Room type inference from labels
+    
+    Matching depends on whether SciPy is installed. With it, labels are
+    assigned optimally across all rooms; without it, each room in turn
+    takes its nearest free label. The results differ when rooms compete
+    for a label, e.g. a room nested inside another.
     """
     
+    # Cost of pairing a room with a label it cannot take; finite so the
+    # assignment solver stays well defined
+    UNMATCHED_COST = 1e18
+    
     def __init__(self):
         self._room_type_counters: Dict[RoomType, int] = {}
     
     def associate_labels(
         self,
         rooms: List[dict],
-        labels: List[TextLabel],
+        labels: Union[List[TextLabel], TextLabelBatch],
         image_size: Tuple[int, int]
     ) -> List[RoomLabelAssociation]:
         """
@@ -372,7 +634,7 @@ class LabelAssociator:
         
         Args:
             rooms: List of detected rooms (from RoomDetector)
-            labels: List of detected text labels
+            labels: Detected text labels, as a list or a TextLabelBatch
             image_size: (width, height) of the image
             
         Returns:
@@ -380,67 +642,69 @@ class LabelAssociator:
         """
         self._room_type_counters = {}
         associations = []
-        used_labels = set()
         
-        for room in rooms:
-            room_id = room.get('id', '')
-            room_center = (
-                room.get('center', {}).get('x', 0),
-                room.get('center', {}).get('y', 0)
-            )
-            room_bounds = room.get('bounds', {})
-            room_area = room.get('area', 0)
-            
-            # Find the nearest label inside or close to this room
-            best_label = None
-            best_distance = float('inf')
-            
-            for i, label in enumerate(labels):
-                if i in used_labels:
-                    continue
-                
-                # Check if label is inside room bounds
-                if self._is_label_in_room(label, room_bounds):
-                    distance = self._calculate_distance(
-                        label.center, room_center
-                    )
-                    if distance < best_distance:
-                        best_distance = distance
-                        best_label = label
-                        best_label_idx = i
-            
-            # If no label inside, check nearby labels
-            if best_label is None:
-                for i, label in enumerate(labels):
-                    if i in used_labels:
-                        continue
-                    
-                    distance = self._calculate_distance(
-                        label.center, room_center
-                    )
-                    
-                    # Only consider labels within reasonable distance
-                    max_distance = max(
-                        room_bounds.get('width', 100),
-                        room_bounds.get('height', 100)
-                    ) * 0.8
-                    
-                    if distance < max_distance and distance < best_distance:
-                        best_distance = distance
-                        best_label = label
-                        best_label_idx = i
+        # Room centers, bounds and fallback search radii, one row per room
+        room_bounds_list = [room.get('bounds', {}) for room in rooms]
+        room_centers = np.array(
+            [
+                (room.get('center', {}).get('x', 0), room.get('center', {}).get('y', 0))
+                for room in rooms
+            ],
+            dtype=np.float64
+        ).reshape(-1, 2)
+        bounds = np.array(
+            [
+                (b.get('x', 0), b.get('y', 0), b.get('width', 0), b.get('height', 0))
+                for b in room_bounds_list
+            ],
+            dtype=np.float64
+        ).reshape(-1, 4)
+        max_distances = np.array(
+            [max(b.get('width', 100), b.get('height', 100)) * 0.8 for b in room_bounds_list],
+            dtype=np.float64
+        )
+        if isinstance(labels, TextLabelBatch):
+            label_centers = labels.centers
+        else:
+            label_centers = np.array(
+                [label.center for label in labels], dtype=np.float64
+            ).reshape(-1, 2)
+        
+        # (rooms, labels) squared distance matrix and label-center-inside-room
+        # mask; only comparisons are needed, so no square roots here
+        label_x = label_centers[None, :, 0]
+        label_y = label_centers[None, :, 1]
+        squared = (
+            (label_x - room_centers[:, 0:1]) ** 2 +
+            (label_y - room_centers[:, 1:2]) ** 2
+        )
+        x, y, w, h = (bounds[:, i:i + 1] for i in range(4))
+        inside = (x <= label_x) & (label_x <= x + w) & (y <= label_y) & (label_y <= y + h)
+        nearby = squared < (max_distances ** 2)[:, None]
+        
+        if linear_sum_assignment is not None and squared.size:
+            matches = self._match_optimal(squared, inside, nearby)
+        else:
+            matches = self._match_greedy(squared, inside, nearby)
+        
+        for index, room in enumerate(rooms):
+            room_bounds = room_bounds_list[index]
             
-            # Mark label as used
-            if best_label is not None:
-                used_labels.add(best_label_idx)
+            label_idx = matches[index]
+            if label_idx is None:
+                best_label = None
+                best_distance = float('inf')
+            else:
+                best_label = labels[label_idx]
+                best_distance = math.sqrt(squared[index, label_idx])
             
             # Determine room type and name
             room_type, room_name, is_default = self._determine_room_info(
-                best_label, room_area, room_bounds, image_size
+                best_label, room.get('area', 0), room_bounds, image_size
             )
             
             associations.append(RoomLabelAssociation(
-                room_id=room_id,
+                room_id=room.get('id', ''),
                 label=best_label,
                 room_type=room_type,
                 room_name=room_name,
@@ -450,40 +714,79 @@ class LabelAssociator:
         
         return associations
     
-    def _is_label_in_room(
-        self, 
-        label: TextLabel, 
-        room_bounds: dict
-    ) -> bool:
+    def _match_greedy(
+        self,
+        squared: np.ndarray,
+        inside: np.ndarray,
+        nearby: np.ndarray
+    ) -> List[Optional[int]]:
         """
-        Check if a label is inside a room's bounding box.
+        Match labels to rooms one room at a time, in room order.
+        
+        Each room takes the nearest unused label inside it, else the
+        nearest unused label within reasonable distance.
         
         Args:
-            label: Text label
-            room_bounds: Room bounding box {x, y, width, height}
+            squared: (rooms, labels) squared distance matrix
+            inside: (rooms, labels) mask of label centers inside each room
+            nearby: (rooms, labels) mask of labels close enough to each room
             
         Returns:
-            True if label center is inside room bounds
+            Label index per room, or None when the room gets no label
         """
-        x = room_bounds.get('x', 0)
-        y = room_bounds.get('y', 0)
-        w = room_bounds.get('width', 0)
-        h = room_bounds.get('height', 0)
+        available = np.ones(squared.shape[1], dtype=bool)
+        matches: List[Optional[int]] = []
+        
+        for index in range(squared.shape[0]):
+            match = None
+            for mask in (inside[index], nearby[index]):
+                candidates = mask & available
+                if candidates.any():
+                    match = int(np.argmin(np.where(candidates, squared[index], np.inf)))
+                    available[match] = False
+                    break
+            matches.append(match)
+        
+        return matches
+    
+    def _match_optimal(
+        self,
+        squared: np.ndarray,
+        inside: np.ndarray,
+        nearby: np.ndarray
+    ) -> List[Optional[int]]:
+        """
+        Match labels to rooms with a globally optimal assignment.
         
-        lx, ly = label.center
+        Solves the assignment problem over squared distances, so an early
+        room cannot take a label that fits a later room much better. The
+        costs make the solver first maximize the number of matched rooms,
+        then the number of labels matched inside their room, then minimize
+        the total squared distance.
         
-        return (x <= lx <= x + w) and (y <= ly <= y + h)
-    
-    def _calculate_distance(
-        self, 
-        point1: Tuple[float, float], 
-        point2: Tuple[float, float]
-    ) -> float:
-        """Calculate Euclidean distance between two points"""
-        return np.sqrt(
-            (point1[0] - point2[0]) ** 2 + 
-            (point1[1] - point2[1]) ** 2
+        Args:
+            squared: (rooms, labels) squared distance matrix
+            inside: (rooms, labels) mask of label centers inside each room
+            nearby: (rooms, labels) mask of labels close enough to each room
+            
+        Returns:
+            Label index per room, or None when the room gets no label
+        """
+        # Larger than any sum of squared distances, so one more inside match
+        # always outweighs shorter distances elsewhere
+        outside_penalty = squared.sum() + 1.0
+        cost = np.where(
+            inside,
+            squared,
+            np.where(nearby, squared + outside_penalty, self.UNMATCHED_COST)
         )
+        
+        matches: List[Optional[int]] = [None] * squared.shape[0]
+        for row, col in zip(*linear_sum_assignment(cost)):
+            if cost[row, col] < self.UNMATCHED_COST:
+                matches[row] = int(col)
+        
+        return matches
     
     def _determine_room_info(
         self,
@@ -610,6 +913,12 @@ class LabelAssociator:
             return RoomType.BEDROOM
 
 
+@functools.lru_cache(maxsize=1)
+def _default_service() -> OCRService:
+    """Shared OCRService for detect_text, so Tesseract is checked only once."""
+    return OCRService()
+
+
 def detect_text(
     image: np.ndarray,
     language: Optional[str] = None
@@ -624,13 +933,60 @@ def detect_text(
     Returns:
         OCRResult with detected labels
     """
-    service = OCRService()
-    return service.detect_text(image, language)
+    return _default_service().detect_text(image, language)
+
+
+# OCRService owned by each detect_text_batch worker process
+_worker_service: Optional[OCRService] = None
+
+
+def _init_worker() -> None:
+    """Process pool initializer: build the worker's OCRService once."""
+    global _worker_service
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _worker_service = OCRService()
+
+
+def _worker_detect(image: np.ndarray, language: Optional[str]) -> OCRResult:
+    """Run OCR on one image with the worker's OCRService."""
+    return _worker_service.detect_text(image, language)
+
+
+def detect_text_batch(
+    images: List[np.ndarray],
+    language: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> List[OCRResult]:
+    """
+    Detect text in several independent images in parallel.
+    
+    Each image is processed by a single threaded Tesseract in its own
+    worker process, so throughput scales with the number of cores.
+    
+    Args:
+        images: Input images (grayscale or BGR)
+        language: OCR language
+        max_workers: Number of worker processes (default: CPU count)
+        
+    Returns:
+        OCRResult for each image, in input order
+    """
+    if not images:
+        return []
+    
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker
+    ) as executor:
+        return list(executor.map(
+            functools.partial(_worker_detect, language=language),
+            images
+        ))
 
 
 def associate_labels_with_rooms(
     rooms: List[dict],
-    labels: List[TextLabel],
+    labels: Union[List[TextLabel], TextLabelBatch],
     image_size: Tuple[int, int]
 ) -> List[RoomLabelAssociation]:
     """
@@ -638,7 +994,7 @@ def associate_labels_with_rooms(
     
     Args:
         rooms: List of detected rooms
-        labels: List of detected text labels
+        labels: Detected text labels, as a list or a TextLabelBatch
         image_size: Image dimensions
         
     Returns:
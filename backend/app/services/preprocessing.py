@@ -11,9 +11,28 @@ Requirements covered:
 import cv2
 import numpy as np
 from PIL import Image
-from typing import Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional
 from dataclasses import dataclass
 
+from app.core.executor import configure_opencv
+
+# Guided filtering needs the opencv-contrib build
+HAS_GUIDED_FILTER = hasattr(cv2, "ximgproc")
+
+# PIL modes that cv2.cvtColor converts to grayscale in a single pass
+PIL_TO_GRAY_CODES = {
+    'RGB': cv2.COLOR_RGB2GRAY,
+    'RGBA': cv2.COLOR_RGBA2GRAY
+}
+
+# PIL modes that cv2.cvtColor converts to BGR in a single pass
+PIL_TO_BGR_CODES = {
+    'RGB': cv2.COLOR_RGB2BGR,
+    'RGBA': cv2.COLOR_RGBA2BGR,
+    'L': cv2.COLOR_GRAY2BGR
+}
+
 
 @dataclass
 class PreprocessingResult:
@@ -37,7 +56,15 @@ class PreprocessingConfig:
     MAX_DIMENSION = 2000
     MIN_DIMENSION = 800
     
-    # Noise reduction parameters
+    # Noise reduction parameters (guided filter when opencv-contrib is
+    # installed, otherwise a median followed by a Gaussian blur)
+    GUIDED_RADIUS = 4
+    GUIDED_EPS = 500
+    MEDIAN_KERNEL_SIZE = 3
+    GAUSSIAN_KERNEL_SIZE = (3, 3)
+    
+    # Deprecated: bilateral filtering is no longer used; kept so existing
+    # config subclasses still load
     BILATERAL_D = 9
     BILATERAL_SIGMA_COLOR = 75
     BILATERAL_SIGMA_SPACE = 75
@@ -51,6 +78,15 @@ class PreprocessingConfig:
     MIN_LINE_LENGTH = 100
     MAX_LINE_GAP = 10
     ANGLE_TOLERANCE = 0.5  # degrees
+    # Skew is estimated on a downscaled copy; the line thresholds above are
+    # scaled to match. Quarter scale loses skews below ~2 degrees.
+    SKEW_DETECTION_SCALE = 0.5
+    # Images whose short side would drop below this are not downscaled
+    SKEW_DETECTION_MIN_SIZE = 32
+    # The Hough estimate is refined by a projection profile search within
+    # +/- SKEW_REFINE_RANGE degrees, down to SKEW_REFINE_STEP resolution
+    SKEW_REFINE_RANGE = 1.0
+    SKEW_REFINE_STEP = 0.1
 
 
 class ImagePreprocessor:
@@ -58,7 +94,7 @@ class ImagePreprocessor:
     Image preprocessing pipeline for floor plan recognition.
     
     Pipeline steps:
-    1. Convert to grayscale
+    1. Convert to grayscale (and shrink oversized inputs)
     2. Apply noise reduction
     3. Enhance contrast
     4. Detect and correct skew
@@ -83,8 +119,12 @@ class ImagePreprocessor:
         # Step 1: Convert to grayscale (Requirement 2.1)
         grayscale = self.convert_to_grayscale(image)
         
+        # Shrink oversized inputs first, so the filters below run on at
+        # most MAX_DIMENSION pixels per side
+        working, prescale = self._prescale_if_large(grayscale)
+        
         # Step 2: Apply noise reduction (Requirement 2.2)
-        denoised = self.remove_noise(grayscale)
+        denoised = self.remove_noise(working)
         
         # Step 3: Enhance contrast (Requirement 2.3)
         enhanced = self.enhance_contrast(denoised)
@@ -100,6 +140,7 @@ class ImagePreprocessor:
         
         # Step 5: Normalize resolution (Requirement 2.5)
         normalized, scale_factor = self.normalize_resolution(corrected)
+        scale_factor *= prescale
         
         processed_size = (normalized.shape[1], normalized.shape[0])
         
@@ -147,8 +188,10 @@ class ImagePreprocessor:
         
         Requirement 2.2: THE Preprocessor SHALL apply noise reduction filtering.
         
-        Uses bilateral filter which preserves edges while smoothing noise,
-        ideal for floor plan images where we need to preserve wall edges.
+        Uses an edge preserving guided filter when cv2.ximgproc is
+        available, otherwise a small median (removes speckle without
+        moving wall edges) followed by a light Gaussian blur. Both cost
+        a fraction of a bilateral filter on floor plan line art.
         
         Args:
             image: Grayscale image
@@ -156,13 +199,16 @@ class ImagePreprocessor:
         Returns:
             Denoised image
         """
-        # Bilateral filter preserves edges while removing noise
-        denoised = cv2.bilateralFilter(
-            image,
-            d=self.config.BILATERAL_D,
-            sigmaColor=self.config.BILATERAL_SIGMA_COLOR,
-            sigmaSpace=self.config.BILATERAL_SIGMA_SPACE
-        )
+        if HAS_GUIDED_FILTER:
+            return cv2.ximgproc.guidedFilter(
+                guide=image,
+                src=image,
+                radius=self.config.GUIDED_RADIUS,
+                eps=self.config.GUIDED_EPS
+            )
+        
+        denoised = cv2.medianBlur(image, self.config.MEDIAN_KERNEL_SIZE)
+        cv2.GaussianBlur(denoised, self.config.GAUSSIAN_KERNEL_SIZE, 0, dst=denoised)
         
         return denoised
     
@@ -203,6 +249,16 @@ class ImagePreprocessor:
         Returns:
             Detected skew angle in degrees (positive = counterclockwise)
         """
+        # The angle is scale invariant, so work on a smaller copy
+        scale = self.config.SKEW_DETECTION_SCALE
+        if min(image.shape[:2]) * scale < self.config.SKEW_DETECTION_MIN_SIZE:
+            scale = 1.0
+        if scale != 1.0:
+            image = cv2.resize(
+                image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+        min_line_length = self.config.MIN_LINE_LENGTH * scale
+        
         # Apply edge detection
         edges = cv2.Canny(image, 50, 150, apertureSize=3)
         
@@ -211,40 +267,32 @@ class ImagePreprocessor:
             edges,
             rho=1,
             theta=np.pi / 180,
-            threshold=self.config.HOUGH_THRESHOLD,
-            minLineLength=self.config.MIN_LINE_LENGTH,
-            maxLineGap=self.config.MAX_LINE_GAP
+            threshold=max(1, round(self.config.HOUGH_THRESHOLD * scale)),
+            minLineLength=min_line_length,
+            maxLineGap=max(1, round(self.config.MAX_LINE_GAP * scale))
         )
         
         if lines is None or len(lines) == 0:
             return 0.0
         
-        # Calculate angles of detected lines
-        angles = []
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            
-            # Skip very short lines
-            length = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-            if length < self.config.MIN_LINE_LENGTH:
-                continue
-            
-            # Calculate angle
-            angle = np.degrees(np.arctan2(y2 - y1, x2 - x1))
-            
-            # Normalize angle to [-45, 45] range
-            # We assume walls are mostly horizontal or vertical
-            angle = angle % 90
-            if angle > 45:
-                angle -= 90
-            
-            angles.append(angle)
+        # Calculate angles of detected lines, skipping very short ones
+        segments = lines.reshape(-1, 4)
+        dx = segments[:, 2] - segments[:, 0]
+        dy = segments[:, 3] - segments[:, 1]
+        long_enough = dx * dx + dy * dy >= min_line_length ** 2
+        angles = np.degrees(np.arctan2(dy[long_enough], dx[long_enough]))
+        
+        # Normalize angles to [-45, 45] range
+        # We assume walls are mostly horizontal or vertical
+        angles %= 90
+        angles[angles > 45] -= 90
         
-        if not angles:
+        if angles.size == 0:
             return 0.0
         
-        # Use median angle to be robust against outliers
-        median_angle = np.median(angles)
+        # Use median angle to be robust against outliers, then refine it;
+        # Hough alone is limited by its 1 degree theta step
+        median_angle = self._refine_skew(edges, float(np.median(angles)))
         
         # Only return significant skew
         if abs(median_angle) < self.config.ANGLE_TOLERANCE:
@@ -252,6 +300,54 @@ class ImagePreprocessor:
         
         return float(median_angle)
 
+    def _refine_skew(self, edges: np.ndarray, angle: float) -> float:
+        """
+        Refine a skew estimate with a projection profile search.
+        
+        Edge pixels are projected onto the row axis at each candidate
+        angle near the estimate; the angle whose profile is most sharply
+        peaked (wall edges collapse into few rows) wins.
+        
+        Args:
+            edges: Edge map the estimate was made from
+            angle: Coarse skew angle in degrees
+            
+        Returns:
+            Refined skew angle in degrees
+        """
+        ys, xs = np.nonzero(edges)
+        if xs.size == 0:
+            return angle
+        xs = xs.astype(np.float32)
+        ys = ys.astype(np.float32)
+        
+        # Offset keeps projected rows non-negative for any small angle
+        offset = edges.shape[1]
+        
+        def score(candidate: float) -> float:
+            theta = np.radians(candidate)
+            rows = (ys * np.cos(theta) - xs * np.sin(theta) + offset).astype(np.int32)
+            profile = np.bincount(rows).astype(np.float64)
+            # The profile total is fixed, so its variance is ordered by the
+            # sum of squares
+            return float(np.dot(profile, profile))
+        
+        # Coarse pass over the whole range at 5 steps, then a fine pass
+        # around the best coarse angle; candidates sit on a fixed grid
+        step = self.config.SKEW_REFINE_STEP
+        coarse_step = step * 5
+        best_angle = round(angle / step) * step
+        for search_step, search_range in (
+            (coarse_step, self.config.SKEW_REFINE_RANGE),
+            (step, coarse_step - step)
+        ):
+            offsets = np.arange(-search_range, search_range + search_step / 2, search_step)
+            candidates = best_angle + offsets
+            scores = [score(candidate) for candidate in candidates]
+            best_angle = round(float(candidates[int(np.argmax(scores))]) / step) * step
+        
+        return round(best_angle, 6)
+    
     def rotate_image(self, image: np.ndarray, angle: float) -> np.ndarray:
         """
         Rotate image to correct skew.
@@ -294,6 +390,34 @@ class ImagePreprocessor:
         
         return rotated
     
+    def _prescale_if_large(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Downscale an image whose larger side exceeds MAX_DIMENSION.
+        
+        This is the downscale branch of normalize_resolution, applied
+        before the per-pixel filters instead of after them.
+        
+        Args:
+            image: Input image
+            
+        Returns:
+            Tuple of (image, scale factor), the image unchanged if small enough
+        """
+        height, width = image.shape[:2]
+        max_dim = max(width, height)
+        
+        if max_dim <= self.config.MAX_DIMENSION:
+            return image, 1.0
+        
+        scale = self.config.MAX_DIMENSION / max_dim
+        resized = cv2.resize(
+            image,
+            (int(width * scale), int(height * scale)),
+            interpolation=cv2.INTER_AREA
+        )
+        
+        return resized, scale
+    
     def normalize_resolution(
         self, 
         image: np.ndarray
@@ -365,20 +489,45 @@ class ImagePreprocessor:
         Returns:
             OpenCV image (BGR format)
         """
-        # Convert to RGB if necessary
-        if pil_image.mode == 'RGBA':
-            pil_image = pil_image.convert('RGB')
-        elif pil_image.mode != 'RGB':
+        # Modes OpenCV can convert straight to BGR go through one cvtColor
+        # pass; anything else (palette, CMYK, ...) is converted to RGB first
+        code = PIL_TO_BGR_CODES.get(pil_image.mode)
+        if code is None:
             pil_image = pil_image.convert('RGB')
+            code = cv2.COLOR_RGB2BGR
         
-        # Convert to numpy array
-        numpy_image = np.array(pil_image)
+        # Convert to numpy array (PIL hands over a copy of its buffer)
+        numpy_image = np.asarray(pil_image)
         
-        # Convert RGB to BGR for OpenCV
-        cv2_image = cv2.cvtColor(numpy_image, cv2.COLOR_RGB2BGR)
+        # Convert to BGR for OpenCV; alpha is dropped as convert('RGB') did
+        cv2_image = cv2.cvtColor(numpy_image, code)
         
         return cv2_image
     
+    @staticmethod
+    def pil_to_gray(pil_image: Image.Image) -> np.ndarray:
+        """
+        Convert PIL Image straight to an OpenCV grayscale image.
+        
+        Gives the same result as pil_to_cv2 followed by
+        convert_to_grayscale, without the intermediate BGR image.
+        
+        Args:
+            pil_image: PIL Image object
+            
+        Returns:
+            Grayscale image
+        """
+        if pil_image.mode == 'L':
+            return np.array(pil_image)
+        
+        code = PIL_TO_GRAY_CODES.get(pil_image.mode)
+        if code is None:
+            pil_image = pil_image.convert('RGB')
+            code = cv2.COLOR_RGB2GRAY
+        
+        return cv2.cvtColor(np.asarray(pil_image), code)
+    
     @staticmethod
     def cv2_to_pil(cv2_image: np.ndarray) -> Image.Image:
         """
@@ -413,15 +562,55 @@ def preprocess_image(image: np.ndarray) -> PreprocessingResult:
     return preprocessor.preprocess(image)
 
 
-def preprocess_pil_image(pil_image: Image.Image) -> PreprocessingResult:
+def preprocess_batch(
+    images: List[np.ndarray],
+    max_workers: Optional[int] = None
+) -> List[PreprocessingResult]:
+    """
+    Preprocess several independent images in parallel.
+    
+    Each image runs in its own worker process with single threaded
+    OpenCV, so throughput scales with the number of cores.
+    
+    Args:
+        images: Input images as numpy arrays
+        max_workers: Number of worker processes (default: CPU count)
+        
+    Returns:
+        PreprocessingResult for each image, in input order
+    """
+    if not images:
+        return []
+    
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=configure_opencv
+    ) as executor:
+        return list(executor.map(preprocess_image, images))
+
+
+def preprocess_pil_image(
+    pil_image: Image.Image,
+    original_size: Optional[Tuple[int, int]] = None
+) -> PreprocessingResult:
     """
     Convenience function to preprocess a PIL Image.
     
     Args:
         pil_image: PIL Image object
+        original_size: (width, height) of the uploaded image when pil_image
+            was drafted smaller while decoding; original_size and
+            scale_factor of the result are then relative to the upload
         
     Returns:
-        PreprocessingResult with all preprocessing outputs
+        PreprocessingResult with all preprocessing outputs (original_image
+        is the grayscale image; no BGR copy is made)
     """
-    cv2_image = ImagePreprocessor.pil_to_cv2(pil_image)
-    return preprocess_image(cv2_image)
+    gray_image = ImagePreprocessor.pil_to_gray(pil_image)
+    result = preprocess_image(gray_image)
+    
+    if original_size is not None and tuple(original_size) != result.original_size:
+        result.scale_factor *= result.original_size[0] / original_size[0]
+        result.original_size = tuple(original_size)
+    
+    return result
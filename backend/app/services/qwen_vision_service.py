@@ -14,13 +14,16 @@ Requirements covered:
 - 5.2: Identify room type keywords
 """
 import os
-import base64
-import json
-import httpx
+import numpy as np
+import orjson
 from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from app.core.base64_utils import strip_data_uri, detect_base64_image_type
+from app.core.http_client import get_client
+from app.core.json_text import extract_json_text
+
 
 class RoomType(Enum):
     """Room type classification"""
@@ -36,6 +39,34 @@ class RoomType(Enum):
     OTHER = "other"
 
 
+# Lookups shared by every response, built once at import
+_ROOM_TYPE_MAP = {
+    "living": RoomType.LIVING,
+    "bedroom": RoomType.BEDROOM,
+    "kitchen": RoomType.KITCHEN,
+    "bathroom": RoomType.BATHROOM,
+    "balcony": RoomType.BALCONY,
+    "dining": RoomType.DINING,
+    "study": RoomType.STUDY,
+    "storage": RoomType.STORAGE,
+    "hallway": RoomType.HALLWAY,
+    "other": RoomType.OTHER,
+}
+
+_ROOM_TYPE_COLORS = {
+    RoomType.LIVING: "#E8D4B8",
+    RoomType.BEDROOM: "#B8D4E8",
+    RoomType.KITCHEN: "#D4E8B8",
+    RoomType.BATHROOM: "#E8B8D4",
+    RoomType.BALCONY: "#D4B8E8",
+    RoomType.DINING: "#E8E8B8",
+    RoomType.STUDY: "#B8E8D4",
+    RoomType.STORAGE: "#D4D4D4",
+    RoomType.HALLWAY: "#E8E8E8",
+    RoomType.OTHER: "#C8C8C8",
+}
+
+
 @dataclass
 class DetectedRoom:
     """Represents a room detected by Vision AI"""
@@ -132,11 +163,16 @@ class QwenVisionService:
         self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         self.api_base = "https://dashscope.aliyuncs.com/compatible-mode/v1"
         self.model = "qwen-vl-max"  # 使用最强的视觉模型
+        self.timeout = 120.0
         
     def is_configured(self) -> bool:
         return bool(self.api_key)
 
-    async def analyze_floor_plan(self, image_base64: str) -> QwenAnalysisResult:
+    async def analyze_floor_plan(
+        self,
+        image_base64: str,
+        image_type: Optional[str] = None
+    ) -> QwenAnalysisResult:
         if not self.is_configured():
             raise ValueError(
                 "DashScope API key not configured. "
@@ -144,10 +180,10 @@ class QwenVisionService:
             )
         
         # Handle data URL prefix
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
+        image_base64 = strip_data_uri(image_base64)
         
-        image_type = self._detect_image_type(image_base64)
+        if image_type is None:
+            image_type = self._detect_image_type(image_base64)
         image_url = f"data:image/{image_type};base64,{image_base64}"
         
         headers = {
@@ -170,38 +206,31 @@ class QwenVisionService:
             "temperature": 0.1
         }
         
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Qwen API error: {response.status_code} - {response.text}")
-            
-            result = response.json()
+        client = get_client()
+        response = await client.post(
+            f"{self.api_base}/chat/completions",
+            headers=headers,
+            content=orjson.dumps(payload),
+            timeout=self.timeout
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Qwen API error: {response.status_code} - {response.text}")
+        
+        result = orjson.loads(response.content)
         
         raw_response = result["choices"][0]["message"]["content"]
         return self._parse_response(raw_response)
     
     def _detect_image_type(self, base64_data: str) -> str:
-        try:
-            header = base64.b64decode(base64_data[:32])
-            if header[:8] == b'\x89PNG\r\n\x1a\n':
-                return "png"
-            elif header[:2] == b'\xff\xd8':
-                return "jpeg"
-        except:
-            pass
-        return "jpeg"
+        return detect_base64_image_type(base64_data)
     
     def _parse_response(self, raw_response: str) -> QwenAnalysisResult:
         json_str = self._extract_json(raw_response)
         
         try:
-            data = json.loads(json_str)
-        except json.JSONDecodeError:
+            data = orjson.loads(json_str)
+        except orjson.JSONDecodeError:
             return QwenAnalysisResult(
                 rooms=[], total_rooms=0, has_scale=False,
                 scale_info=None, raw_response=raw_response
@@ -231,24 +260,10 @@ class QwenVisionService:
         )
     
     def _extract_json(self, text: str) -> str:
-        import re
-        json_match = re.search(r'```(?:json)?\s*\n?([\s\S]*?)\n?```', text)
-        if json_match:
-            return json_match.group(1).strip()
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if json_match:
-            return json_match.group(0)
-        return text
+        return extract_json_text(text)
     
     def _parse_room_type(self, type_str: str) -> RoomType:
-        type_map = {
-            "living": RoomType.LIVING, "bedroom": RoomType.BEDROOM,
-            "kitchen": RoomType.KITCHEN, "bathroom": RoomType.BATHROOM,
-            "balcony": RoomType.BALCONY, "dining": RoomType.DINING,
-            "study": RoomType.STUDY, "storage": RoomType.STORAGE,
-            "hallway": RoomType.HALLWAY, "other": RoomType.OTHER,
-        }
-        return type_map.get(type_str.lower(), RoomType.OTHER)
+        return _ROOM_TYPE_MAP.get(type_str.lower(), RoomType.OTHER)
 
 
 def convert_to_homedata_rooms(
@@ -265,25 +280,24 @@ def convert_to_homedata_rooms(
     - 3D 场景使用米为单位，原点在场景中心
     - 需要将图片坐标转换为以场景中心为原点的 3D 坐标
     """
-    color_map = {
-        RoomType.LIVING: "#E8D4B8", RoomType.BEDROOM: "#B8D4E8",
-        RoomType.KITCHEN: "#D4E8B8", RoomType.BATHROOM: "#E8B8D4",
-        RoomType.BALCONY: "#D4B8E8", RoomType.DINING: "#E8E8B8",
-        RoomType.STUDY: "#B8E8D4", RoomType.STORAGE: "#D4D4D4",
-        RoomType.HALLWAY: "#E8E8E8", RoomType.OTHER: "#C8C8C8",
-    }
-    
     rooms = []
     
     # 计算所有房间的边界，用于确定整体户型范围
     if not result.rooms:
         return rooms
     
+    # 所有房间的边界 (N, 4)：x, y, width, height（百分比）
+    bounds = np.array(
+        [
+            (r.bounds["x"], r.bounds["y"], r.bounds["width"], r.bounds["height"])
+            for r in result.rooms
+        ],
+        dtype=np.float64
+    )
+    
     # 找出所有房间的整体边界
-    min_x = min(r.bounds["x"] for r in result.rooms)
-    min_y = min(r.bounds["y"] for r in result.rooms)
-    max_x = max(r.bounds["x"] + r.bounds["width"] for r in result.rooms)
-    max_y = max(r.bounds["y"] + r.bounds["height"] for r in result.rooms)
+    min_x, min_y = bounds[:, :2].min(axis=0)
+    max_x, max_y = (bounds[:, :2] + bounds[:, 2:]).max(axis=0)
     
     # 户型整体尺寸（百分比）
     total_width_pct = max_x - min_x
@@ -297,31 +311,18 @@ def convert_to_homedata_rooms(
     # 使用较小的缩放因子让房间更紧凑
     scale_factor = min(image_width, image_height) / pixels_per_meter / 100
     
-    for room in result.rooms:
-        # 房间在图片中的位置（百分比）
-        room_x = room.bounds["x"]
-        room_y = room.bounds["y"]
-        room_w = room.bounds["width"]
-        room_h = room.bounds["height"]
-        
-        # 房间中心点（百分比）
-        room_center_x_pct = room_x + room_w / 2
-        room_center_y_pct = room_y + room_h / 2
-        
-        # 相对于户型中心的偏移（百分比）
-        offset_x_pct = room_center_x_pct - center_x_pct
-        offset_y_pct = room_center_y_pct - center_y_pct
-        
-        # 转换为米（3D 坐标）
-        # x 轴：向右为正
-        # z 轴：向下为正（对应图片 y 轴）
-        pos_x = offset_x_pct * scale_factor
-        pos_z = offset_y_pct * scale_factor
-        
-        # 房间尺寸（米）
-        width = room_w * scale_factor
-        depth = room_h * scale_factor
-        
+    # 房间中心点相对于户型中心的偏移（百分比），再转换为米（3D 坐标）
+    # x 轴：向右为正
+    # z 轴：向下为正（对应图片 y 轴）
+    offsets = bounds[:, :2] + bounds[:, 2:] / 2 - (center_x_pct, center_y_pct)
+    positions = offsets * scale_factor
+    
+    # 房间尺寸（米）
+    sizes = bounds[:, 2:] * scale_factor
+    
+    for room, (pos_x, pos_z), (width, depth) in zip(
+        result.rooms, positions.tolist(), sizes.tolist()
+    ):
         rooms.append({
             "id": room.id,
             "name": room.name,
@@ -332,7 +333,7 @@ def convert_to_homedata_rooms(
                 "height": 3,
                 "depth": round(max(depth, 1), 2)   # 最小 1 米
             },
-            "color": color_map.get(room.type, "#C8C8C8"),
+            "color": _ROOM_TYPE_COLORS.get(room.type, "#C8C8C8"),
             "devices": []
         })
     
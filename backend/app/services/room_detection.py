@@ -7,9 +7,12 @@ Requirements covered:
 - 4.3: Calculate room dimensions (width, depth)
 - 4.4: Detect room shape (rectangular, L-shaped, etc.)
 """
+import math
+
 import cv2
 import numpy as np
 from typing import List, Tuple, Optional
+from collections import Counter
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -94,20 +97,21 @@ class RoomDetectionResult:
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization"""
         return {
-            "rooms": [r.to_dict() for r in self.rooms],
+            "rooms": self.rooms_as_dicts(),
             "image_size": {"width": self.image_size[0], "height": self.image_size[1]},
             "room_count": len(self.rooms),
             "total_room_area": self.total_room_area,
-            "shape_distribution": self._get_shape_distribution()
+            "shape_distribution": self.shape_distribution
         }
     
-    def _get_shape_distribution(self) -> dict:
+    def rooms_as_dicts(self) -> List[dict]:
+        """Convert all rooms to dictionaries for JSON serialization"""
+        return [room.to_dict() for room in self.rooms]
+    
+    @property
+    def shape_distribution(self) -> dict:
         """Get count of each room shape type"""
-        distribution = {}
-        for room in self.rooms:
-            shape = room.shape.value
-            distribution[shape] = distribution.get(shape, 0) + 1
-        return distribution
+        return dict(Counter(room.shape.value for room in self.rooms))
 
 
 class RoomDetectionConfig:
@@ -831,15 +835,15 @@ class RoomDetector:
             
             # Calculate angle using dot product
             dot = v1[0] * v2[0] + v1[1] * v2[1]
-            mag1 = np.sqrt(v1[0]**2 + v1[1]**2)
-            mag2 = np.sqrt(v2[0]**2 + v2[1]**2)
+            mag1 = math.sqrt(v1[0]**2 + v1[1]**2)
+            mag2 = math.sqrt(v2[0]**2 + v2[1]**2)
             
             if mag1 == 0 or mag2 == 0:
                 continue
             
             cos_angle = dot / (mag1 * mag2)
-            cos_angle = np.clip(cos_angle, -1, 1)
-            angle = np.degrees(np.arccos(cos_angle))
+            cos_angle = max(-1.0, min(1.0, cos_angle))
+            angle = math.degrees(math.acos(cos_angle))
             
             # Check if angle is approximately 90 degrees
             if abs(angle - 90) <= tolerance:
@@ -11,14 +11,21 @@ Requirements covered:
 - 5.1: Use OCR to detect text in the image
 - 5.2: Identify room type keywords
 """
+import logging
 import os
-import base64
-import json
-import httpx
+import asyncio
+import orjson
 from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from app.core.base64_utils import detect_base64_image_type
+from app.core.http_client import get_client
+from app.core.json_text import extract_json_text
+
+
+logger = logging.getLogger(__name__)
+
 
 class RoomType(Enum):
     """Room type classification"""
@@ -34,6 +41,34 @@ class RoomType(Enum):
     OTHER = "other"
 
 
+# Lookups shared by every response, built once at import
+_ROOM_TYPE_MAP = {
+    "living": RoomType.LIVING,
+    "bedroom": RoomType.BEDROOM,
+    "kitchen": RoomType.KITCHEN,
+    "bathroom": RoomType.BATHROOM,
+    "balcony": RoomType.BALCONY,
+    "dining": RoomType.DINING,
+    "study": RoomType.STUDY,
+    "storage": RoomType.STORAGE,
+    "hallway": RoomType.HALLWAY,
+    "other": RoomType.OTHER,
+}
+
+_ROOM_TYPE_COLORS = {
+    RoomType.LIVING: "#E8D4B8",
+    RoomType.BEDROOM: "#B8D4E8",
+    RoomType.KITCHEN: "#D4E8B8",
+    RoomType.BATHROOM: "#E8B8D4",
+    RoomType.BALCONY: "#D4B8E8",
+    RoomType.DINING: "#E8E8B8",
+    RoomType.STUDY: "#B8E8D4",
+    RoomType.STORAGE: "#D4D4D4",
+    RoomType.HALLWAY: "#E8E8E8",
+    RoomType.OTHER: "#C8C8C8",
+}
+
+
 @dataclass
 class DetectedRoom:
     """Represents a room detected by Vision AI"""
@@ -209,18 +244,19 @@ class VisionAIService:
         }
         
         # Make the API call
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                raise Exception(f"OpenAI API error: {response.status_code} - {error_detail}")
-            
-            result = response.json()
+        client = get_client()
+        response = await client.post(
+            f"{self.api_base}/chat/completions",
+            headers=headers,
+            content=orjson.dumps(payload),
+            timeout=60.0
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            raise Exception(f"OpenAI API error: {response.status_code} - {error_detail}")
+        
+        result = orjson.loads(response.content)
         
         # Extract the response content
         raw_response = result["choices"][0]["message"]["content"]
@@ -243,25 +279,11 @@ class VisionAIService:
         Returns:
             VisionAnalysisResult with detected rooms
         """
-        import asyncio
         return asyncio.run(self.analyze_floor_plan(image_base64, detail))
     
     def _detect_image_type(self, base64_data: str) -> str:
         """Detect image type from base64 data."""
-        # Check first few bytes of decoded data
-        try:
-            header = base64.b64decode(base64_data[:32])
-            if header[:8] == b'\x89PNG\r\n\x1a\n':
-                return "png"
-            elif header[:2] == b'\xff\xd8':
-                return "jpeg"
-            elif header[:6] in (b'GIF87a', b'GIF89a'):
-                return "gif"
-            elif header[:4] == b'RIFF' and header[8:12] == b'WEBP':
-                return "webp"
-        except:
-            pass
-        return "jpeg"  # Default to JPEG
+        return detect_base64_image_type(base64_data)
     
     def _parse_response(self, raw_response: str) -> VisionAnalysisResult:
         """
@@ -277,8 +299,8 @@ class VisionAIService:
         json_str = self._extract_json(raw_response)
         
         try:
-            data = json.loads(json_str)
-        except json.JSONDecodeError as e:
+            data = orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
             # If parsing fails, return empty result with raw response
             return VisionAnalysisResult(
                 rooms=[],
@@ -302,7 +324,7 @@ class VisionAIService:
                 )
                 rooms.append(room)
             except Exception as e:
-                print(f"Warning: Failed to parse room {i}: {e}")
+                logger.warning("Failed to parse room %d: %s", i, e)
                 continue
         
         return VisionAnalysisResult(
@@ -315,36 +337,11 @@ class VisionAIService:
     
     def _extract_json(self, text: str) -> str:
         """Extract JSON from text that may contain markdown code blocks."""
-        # Try to find JSON in code blocks
-        import re
-        
-        # Look for ```json ... ``` blocks
-        json_match = re.search(r'```(?:json)?\s*\n?([\s\S]*?)\n?```', text)
-        if json_match:
-            return json_match.group(1).strip()
-        
-        # Look for raw JSON (starts with {)
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if json_match:
-            return json_match.group(0)
-        
-        return text
+        return extract_json_text(text)
     
     def _parse_room_type(self, type_str: str) -> RoomType:
         """Parse room type string to enum."""
-        type_map = {
-            "living": RoomType.LIVING,
-            "bedroom": RoomType.BEDROOM,
-            "kitchen": RoomType.KITCHEN,
-            "bathroom": RoomType.BATHROOM,
-            "balcony": RoomType.BALCONY,
-            "dining": RoomType.DINING,
-            "study": RoomType.STUDY,
-            "storage": RoomType.STORAGE,
-            "hallway": RoomType.HALLWAY,
-            "other": RoomType.OTHER,
-        }
-        return type_map.get(type_str.lower(), RoomType.OTHER)
+        return _ROOM_TYPE_MAP.get(type_str.lower(), RoomType.OTHER)
 
 
 def convert_to_homedata_rooms(
@@ -365,20 +362,6 @@ def convert_to_homedata_rooms(
     Returns:
         List of room dictionaries in homeData format
     """
-    # Room type to color mapping
-    color_map = {
-        RoomType.LIVING: "#E8D4B8",
-        RoomType.BEDROOM: "#B8D4E8",
-        RoomType.KITCHEN: "#D4E8B8",
-        RoomType.BATHROOM: "#E8B8D4",
-        RoomType.BALCONY: "#D4B8E8",
-        RoomType.DINING: "#E8E8B8",
-        RoomType.STUDY: "#B8E8D4",
-        RoomType.STORAGE: "#D4D4D4",
-        RoomType.HALLWAY: "#E8E8E8",
-        RoomType.OTHER: "#C8C8C8",
-    }
-    
     rooms = []
     
     # Calculate image center for coordinate transformation
@@ -410,7 +393,7 @@ def convert_to_homedata_rooms(
             "type": room.type.value,
             "position": {"x": round(pos_x, 2), "y": 0, "z": round(pos_z, 2)},
             "size": {"width": round(width, 2), "height": 3, "depth": round(depth, 2)},
-            "color": color_map.get(room.type, "#C8C8C8"),
+            "color": _ROOM_TYPE_COLORS.get(room.type, "#C8C8C8"),
             "devices": []
         })
     
@@ -7,6 +7,8 @@ Requirements covered:
 - 3.3: Detect wall thickness
 - 3.4: Output wall coordinates as line segments
 """
+import math
+
 import cv2
 import numpy as np
 from typing import List, Tuple, Optional
@@ -35,14 +37,14 @@ class WallSegment:
         """Calculate wall segment length"""
         dx = self.end[0] - self.start[0]
         dy = self.end[1] - self.start[1]
-        return np.sqrt(dx * dx + dy * dy)
+        return math.sqrt(dx * dx + dy * dy)
     
     @property
     def angle(self) -> float:
         """Calculate wall angle in degrees"""
         dx = self.end[0] - self.start[0]
         dy = self.end[1] - self.start[1]
-        return np.degrees(np.arctan2(dy, dx))
+        return math.degrees(math.atan2(dy, dx))
     
     @property
     def midpoint(self) -> Tuple[float, float]:
@@ -89,12 +91,44 @@ class WallDetectionResult:
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization"""
         return {
-            "walls": [w.to_dict() for w in self.walls],
+            "walls": self.walls_as_dicts(),
             "image_size": {"width": self.image_size[0], "height": self.image_size[1]},
             "wall_count": len(self.walls),
             "exterior_walls": len([w for w in self.walls if w.wall_type == WallType.EXTERIOR]),
             "interior_walls": len([w for w in self.walls if w.wall_type == WallType.INTERIOR])
         }
+    
+    def walls_as_dicts(self) -> List[dict]:
+        """
+        Convert all walls to dictionaries for JSON serialization.
+        
+        Same output as WallSegment.to_dict, but length and angle are
+        computed for all walls at once and each column is converted to
+        Python numbers with a single tolist().
+        """
+        if not self.walls:
+            return []
+        
+        endpoints = np.array([(*w.start, *w.end) for w in self.walls])
+        dx = endpoints[:, 2] - endpoints[:, 0]
+        dy = endpoints[:, 3] - endpoints[:, 1]
+        lengths = np.sqrt(dx * dx + dy * dy).tolist()
+        angles = np.degrees(np.arctan2(dy, dx)).tolist()
+        
+        return [
+            {
+                "start": points[:2],
+                "end": points[2:],
+                "thickness": wall.thickness,
+                "wall_type": wall.wall_type.value,
+                "confidence": wall.confidence,
+                "length": length,
+                "angle": angle
+            }
+            for wall, points, length, angle in zip(
+                self.walls, endpoints.tolist(), lengths, angles
+            )
+        ]
 
 
 class WallDetectionConfig:
@@ -328,7 +362,7 @@ class WallDetector:
         
         for line in lines:
             x1, y1, x2, y2 = line
-            angle = np.degrees(np.arctan2(y2 - y1, x2 - x1))
+            angle = math.degrees(math.atan2(y2 - y1, x2 - x1))
             
             # Normalize angle to [0, 180)
             angle = angle % 180
@@ -531,7 +565,7 @@ class WallDetector:
             x1, y1, x2, y2 = line
             
             # Filter out very short lines
-            length = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+            length = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
             if length < self.config.MIN_WALL_LENGTH:
                 continue
             
@@ -578,7 +612,7 @@ class WallDetector:
         # Calculate perpendicular direction
         dx = x2 - x1
         dy = y2 - y1
-        length = np.sqrt(dx * dx + dy * dy)
+        length = math.sqrt(dx * dx + dy * dy)
         
         if length == 0:
             return self.config.DEFAULT_WALL_THICKNESS
@@ -704,7 +738,7 @@ class WallDetector:
             
             min_dist = float('inf')
             for point in exterior_boundary:
-                dist = np.sqrt(
+                dist = math.sqrt(
                     (midpoint[0] - point[0]) ** 2 +
                     (midpoint[1] - point[1]) ** 2
                 )
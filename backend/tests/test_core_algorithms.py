@@ -8,21 +8,34 @@ Checkpoint 6: 核心算法验证
 """
 import sys
 import os
+import asyncio
+import base64
+import gc
+import io
 import numpy as np
 import cv2
+import orjson
+import pytest
 from typing import Tuple
+from PIL import Image
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from app.core.json_text import extract_json_text
+from app.services.image_service import ImageService, ImageValidationError
 from app.services.preprocessing import ImagePreprocessor, preprocess_image
 from app.services.wall_detection import WallDetector, WallDetectionConfig, WallType
 from app.services.room_detection import RoomDetector, RoomDetectionConfig, RoomShape
+from app.services import gemini_vision_service, ocr_service
+from app.services.gemini_vision_service import GeminiVisionService
 from app.services.ocr_service import (
     OCRService, 
     LabelAssociator, 
     RoomType, 
     TextLabel,
+    TextLabelBatch,
+    OCRResult,
     ROOM_TYPE_KEYWORDS,
     DEFAULT_ROOM_NAMES
 )
@@ -158,6 +171,24 @@ class TestPreprocessing:
         print("  ✓ Grayscale conversion works correctly")
         return True
     
+    
+    def test_pil_to_gray_matches_bgr_path(self):
+        """Test direct PIL to grayscale equals the BGR round trip"""
+        print("\n[TEST] PIL grayscale conversion...")
+        
+        rng = np.random.default_rng(0)
+        rgba = Image.fromarray(rng.integers(0, 256, (60, 80, 4), dtype=np.uint8), "RGBA")
+        preprocessor = ImagePreprocessor()
+        
+        for mode in ("L", "RGB", "RGBA", "P", "LA"):
+            pil_image = rgba.convert(mode)
+            expected = preprocessor.convert_to_grayscale(ImagePreprocessor.pil_to_cv2(pil_image))
+            gray = ImagePreprocessor.pil_to_gray(pil_image)
+            assert gray.dtype == expected.dtype and gray.shape == expected.shape, mode
+            assert np.array_equal(gray, expected), f"{mode} image differs"
+        
+        print("  ✓ PIL grayscale conversion matches for L, RGB, RGBA, P and LA")
+        return True
     def test_noise_reduction(self):
         """Test noise reduction preserves edges"""
         print("\n[TEST] Noise reduction...")
@@ -214,6 +245,39 @@ class TestPreprocessing:
         print(f"  Scale factor: {result.scale_factor}")
         print("  ✓ Full preprocessing pipeline works correctly")
         return True
+    
+    
+    def test_skew_detection_accuracy(self):
+        """Test skew detection recovers small and large rotations"""
+        print("\n[TEST] Skew detection accuracy...")
+        
+        preprocessor = ImagePreprocessor()
+        grayscale = preprocessor.convert_to_grayscale(create_multi_room_floor_plan())
+        height, width = grayscale.shape
+        
+        for angle in (0.7, 5.3):
+            # Rotate counterclockwise; detect_skew returns the angle that
+            # rotate_image needs to undo it
+            matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+            skewed = cv2.warpAffine(grayscale, matrix, (width, height), borderValue=255)
+            
+            detected = preprocessor.detect_skew(skewed)
+            print(f"  Rotated {angle}°, detected {detected}°")
+            assert abs(detected + angle) <= 0.1, f"Skew of {angle}° detected as {detected}°"
+        
+        print("  ✓ Skew detection is accurate to 0.1°")
+        return True
+    def test_degenerate_image_sizes(self):
+        """Test that 1-pixel wide images get through the pipeline"""
+        print("\n[TEST] Degenerate image sizes...")
+        
+        for shape in [(1, 50, 3), (1, 1, 3)]:
+            result = preprocess_image(np.full(shape, 255, dtype=np.uint8))
+            assert result.original_size == (shape[1], shape[0])
+            assert min(result.processed_size) >= 1, "Should produce an image"
+        
+        print("  ✓ Degenerate image sizes are handled")
+        return True
 
 
 class TestWallDetection:
@@ -310,6 +374,22 @@ class TestWallDetection:
         
         print("  ✓ Multi-room wall detection works correctly")
         return True
+    
+    def test_walls_as_dicts(self):
+        """Test that batched wall serialization matches per-wall to_dict"""
+        print("\n[TEST] Batched wall serialization...")
+        
+        image = create_multi_room_floor_plan()
+        preprocessor = ImagePreprocessor()
+        grayscale = preprocessor.convert_to_grayscale(image)
+        
+        detector = WallDetector()
+        result = detector.detect(grayscale)
+        
+        assert result.walls_as_dicts() == [w.to_dict() for w in result.walls]
+        
+        print("  ✓ Batched wall serialization works correctly")
+        return True
 
 
 class TestRoomDetection:
@@ -546,6 +626,47 @@ class TestOCR:
         print("  ✓ Room type inference works correctly")
         return True
     
+    
+    def test_keyword_classification_table(self):
+        """Test keyword matching agrees with the plain nested-loop rule"""
+        print("\n[TEST] Keyword classification table...")
+        
+        def reference(text):
+            text_lower = text.lower()
+            for room_type, keywords in ROOM_TYPE_KEYWORDS.items():
+                for keyword in keywords:
+                    if keyword.lower() in text_lower or text_lower in keyword.lower():
+                        return room_type
+            return None
+        
+        # Every keyword, its substrings ("主卧" of "主卧室"), keywords inside
+        # longer labels, mixed case, the empty string and unrelated text
+        texts = {"", "xyz123", "3.5m", "Living Room", "主卧室A", "次卧 12㎡"}
+        for keywords in ROOM_TYPE_KEYWORDS.values():
+            for keyword in keywords:
+                texts.update(keyword[i:j] for i in range(len(keyword)) for j in range(i + 1, len(keyword) + 1))
+                texts.add(f"[{keyword.upper()}]")
+        
+        assert ocr_service._classify_text("主卧") == RoomType.BEDROOM
+        assert ocr_service._classify_text("") == reference("")
+        
+        # Compare the active branch, then the regex fallback on its own
+        saved_automaton = ocr_service.KEYWORD_AUTOMATON
+        branches = [saved_automaton, None] if saved_automaton is not None else [None]
+        try:
+            for automaton in branches:
+                ocr_service.KEYWORD_AUTOMATON = automaton
+                ocr_service._classify_text.cache_clear()
+                for text in sorted(texts):
+                    assert ocr_service._classify_text(text) == reference(text), \
+                        f"{text!r}: {ocr_service._classify_text(text)} != {reference(text)}"
+        finally:
+            ocr_service.KEYWORD_AUTOMATON = saved_automaton
+            ocr_service._classify_text.cache_clear()
+        
+        print(f"  Checked {len(texts)} labels")
+        print("  ✓ Keyword classification matches the reference rule")
+        return True
     def test_label_association(self):
         """Test label-room association logic"""
         print("\n[TEST] Label-room association...")
@@ -606,6 +727,96 @@ class TestOCR:
         print("  ✓ Label-room association works correctly")
         return True
     
+    def test_label_batch_association(self):
+        """Test a TextLabelBatch associates like the equivalent label list"""
+        print("\n[TEST] Label batch association...")
+        
+        rng = np.random.default_rng(0)
+        rooms = [
+            {
+                "id": f"room-{i + 1}",
+                "center": {"x": x + 100, "y": y + 75},
+                "bounds": {"x": x, "y": y, "width": 200, "height": 150},
+                "area": 30000
+            }
+            for i, (x, y) in enumerate([(0, 0), (200, 0), (400, 0), (0, 150), (200, 150)])
+        ]
+        texts = ["客厅", "主卧", "厨房", "卫生间", "阳台", "3.5m", "次卧", "餐厅"]
+        labels = []
+        for text in texts:
+            x, y = rng.integers(0, 560), rng.integers(0, 290)
+            labels.append(TextLabel(
+                text=text,
+                position=(int(x), int(y)),
+                size=(40, 20),
+                confidence=float(rng.uniform(40, 95)),
+                center=(int(x) + 20.0, int(y) + 10.0),
+                room_type=ocr_service._classify_text(text)
+            ))
+        batch = TextLabelBatch.from_labels(labels)
+        
+        from_list = LabelAssociator().associate_labels(rooms, labels, (600, 300))
+        from_batch = LabelAssociator().associate_labels(rooms, batch, (600, 300))
+        assert [a.to_dict() for a in from_list] == [a.to_dict() for a in from_batch]
+        assert any(a.label is not None for a in from_batch), "Some rooms should get labels"
+        
+        # OCRResult serializes a batch exactly like the list it came from
+        assert OCRResult(batch, (600, 300), "eng").to_dict() == \
+            OCRResult(labels, (600, 300), "eng").to_dict()
+        
+        print("  ✓ Label batches and lists associate identically")
+        return True
+    @pytest.mark.skipif(
+        ocr_service.linear_sum_assignment is None, reason="SciPy not installed"
+    )
+    def test_nested_room_association(self):
+        """Test optimal matching when a small room sits inside a large one"""
+        print("\n[TEST] Nested room association...")
+        
+        rooms = [
+            {
+                "id": "room-1",
+                "center": {"x": 200, "y": 200},
+                "bounds": {"x": 0, "y": 0, "width": 400, "height": 400},
+                "area": 160000
+            },
+            {
+                "id": "room-2",
+                "center": {"x": 270, "y": 270},
+                "bounds": {"x": 220, "y": 220, "width": 100, "height": 100},
+                "area": 10000
+            }
+        ]
+        
+        # The closet label is nearer the outer room's center than the
+        # living room label, so greedy matching gives it to room-1
+        labels = [
+            TextLabel(
+                text="储物间",
+                position=(235, 250),
+                size=(50, 20),
+                confidence=90.0,
+                center=(260, 260),
+                room_type=RoomType.STORAGE
+            ),
+            TextLabel(
+                text="客厅",
+                position=(55, 70),
+                size=(50, 20),
+                confidence=90.0,
+                center=(80, 80),
+                room_type=RoomType.LIVING
+            )
+        ]
+        
+        associator = LabelAssociator()
+        associations = associator.associate_labels(rooms, labels, (400, 400))
+        
+        assert associations[0].label.text == "客厅"
+        assert associations[1].label.text == "储物间"
+        
+        print("  ✓ Nested rooms each get their own label")
+        return True
     def test_default_name_assignment(self):
         """Test default name assignment when no label detected"""
         print("\n[TEST] Default name assignment...")
@@ -668,6 +879,253 @@ class TestOCR:
         return True
 
 
+class TestImageService:
+    """Test image upload handling"""
+    
+    def test_decode_cache_byte_budget(self):
+        """Test decode cache eviction by decoded size"""
+        print("\n[TEST] Decode cache byte budget...")
+        
+        saved_budget = ImageService.DECODE_CACHE_MAX_BYTES
+        ImageService._decode_cache.clear()
+        ImageService._decode_cache_bytes = 0
+        
+        # Each 100x100 BGR image decodes to 30000 bytes, so two fit
+        ImageService.DECODE_CACHE_MAX_BYTES = 70000
+        try:
+            for value in range(3):
+                image = np.full((100, 100, 3), value, dtype=np.uint8)
+                _, buffer = cv2.imencode(".png", image)
+                ImageService.process_upload_ndarray(base64.b64encode(buffer).decode())
+            
+            assert len(ImageService._decode_cache) == 2, "Oldest entry should be evicted"
+            assert ImageService._decode_cache_bytes == 60000
+            first_value = next(iter(ImageService._decode_cache.values()))[0][0, 0, 0]
+            assert first_value == 1, "Least recently used entry should go first"
+        finally:
+            ImageService.DECODE_CACHE_MAX_BYTES = saved_budget
+            ImageService._decode_cache.clear()
+            ImageService._decode_cache_bytes = 0
+        
+        print("  ✓ Decode cache stays within its byte budget")
+        return True
+    
+    def test_header_probe(self):
+        """Test PNG/JPEG header parsing and format rejection"""
+        print("\n[TEST] Header probe...")
+        
+        def encode(image_format, **params):
+            buffer = io.BytesIO()
+            Image.new("RGB", (123, 45), "white").save(buffer, image_format, **params)
+            return buffer.getvalue()
+        
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation, stored in an APP1 segment before SOF
+        exif_jpeg = encode("JPEG", exif=exif.tobytes())
+        
+        assert ImageService.probe_header(encode("PNG")) == ("PNG", 123, 45)
+        assert ImageService.probe_header(encode("JPEG")) == ("JPEG", 123, 45)
+        assert ImageService.probe_header(encode("JPEG", progressive=True)) == ("JPEG", 123, 45)
+        assert ImageService.probe_header(exif_jpeg) == ("JPEG", 123, 45)
+        
+        # Cut off before the frame header: no size, and the upload is rejected
+        truncated = exif_jpeg[:30]
+        assert ImageService.probe_header(truncated) is None
+        try:
+            ImageService.inspect_upload_bytes(truncated)
+            assert False, "Truncated JPEG should be rejected"
+        except ImageValidationError:
+            pass
+        
+        result = ImageService.inspect_upload_bytes(exif_jpeg, "plan.jpg")
+        assert (result["format"], result["width"], result["height"]) == ("JPEG", 123, 45)
+        
+        for image_format in ("GIF", "WEBP"):
+            try:
+                ImageService.inspect_upload_bytes(encode(image_format))
+                assert False, f"{image_format} should be rejected"
+            except ImageValidationError as e:
+                assert "Unsupported image format" in str(e)
+        
+        print("  ✓ Header probe works correctly")
+        return True
+
+
+class TestResponseParsing:
+    """Test extraction of JSON from vision model replies"""
+    
+    def test_extract_json_text(self):
+        """Test fenced, prose-wrapped and malformed replies"""
+        print("\n[TEST] JSON extraction...")
+        
+        cases = [
+            ('```json\n{"rooms": []}\n```', '{"rooms": []}'),
+            ('Result:\n```\n{"rooms": []}\n```\nDone.', '{"rooms": []}'),
+            ('Here is the layout: {"rooms": []} Hope this helps.', '{"rooms": []}'),
+            # Braces and escaped quotes inside strings do not end the object
+            ('{"name": "a } b", "note": "say \\"{\\""} trailing }',
+             '{"name": "a } b", "note": "say \\"{\\""}'),
+            # Never balanced: falls back to the span ending at the last "}"
+            ('Partial: {"rooms": [{"id": 1} (cut off)', '{"rooms": [{"id": 1}'),
+            ('no json here', 'no json here'),
+        ]
+        for text, expected in cases:
+            assert extract_json_text(text) == expected, f"Wrong extraction from {text!r}"
+        
+        print("  ✓ JSON extraction works correctly")
+        return True
+
+
+class FakeGeminiResponse:
+    """Minimal stand-in for an httpx response"""
+    
+    def __init__(self, status_code: int, content: bytes):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+
+
+class FakeGeminiClient:
+    """Fake HTTP client answering per API key, tracking concurrent calls"""
+    
+    REPLY = orjson.dumps({
+        "candidates": [{"content": {"parts": [{"text": '{"rooms": [{"name": "客厅"}]}'}]}}]
+    })
+    
+    def __init__(self, statuses: dict):
+        self.statuses = statuses
+        self.keys = []
+        self.active = {}
+        self.peak = {}
+    
+    async def post(self, url, params, **kwargs):
+        key = params["key"]
+        self.keys.append(key)
+        self.active[key] = self.active.get(key, 0) + 1
+        self.peak[key] = max(self.peak.get(key, 0), self.active[key])
+        await asyncio.sleep(0.01)
+        self.active[key] -= 1
+        status = self.statuses[key]
+        return FakeGeminiResponse(status, self.REPLY if status == 200 else b"rate limited")
+
+
+class TestGeminiService:
+    """Test Gemini request handling with a fake HTTP client"""
+    
+    def _service(self, keys: str, concurrency: str = "8") -> GeminiVisionService:
+        saved = {name: os.environ.get(name) for name in ("GEMINI_API_KEYS", "GEMINI_KEY_CONCURRENCY")}
+        os.environ["GEMINI_API_KEYS"] = keys
+        os.environ["GEMINI_KEY_CONCURRENCY"] = concurrency
+        try:
+            return GeminiVisionService()
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    
+    def _run_with_client(self, client: FakeGeminiClient, coroutine_factory):
+        saved_get_client = gemini_vision_service.get_client
+        gemini_vision_service.get_client = lambda: client
+        try:
+            return asyncio.run(coroutine_factory())
+        finally:
+            gemini_vision_service.get_client = saved_get_client
+    
+    def test_rate_limit_retry_uses_next_key(self):
+        """Test a 429 is retried on a different key under concurrency"""
+        print("\n[TEST] Gemini key rotation...")
+        
+        service = self._service("limited,free")
+        client = FakeGeminiClient({"limited": 429, "free": 200})
+        
+        async def analyze_two():
+            return await asyncio.gather(
+                service._analyze("iVBORw0KGgoAAAA1", "png"),
+                service._analyze("iVBORw0KGgoAAAA2", "png")
+            )
+        
+        results = self._run_with_client(client, analyze_two)
+        
+        # One request starts on each key; the rate limited one moves on to
+        # the free key instead of being sent back to the limited one
+        assert [len(r.rooms) for r in results] == [1, 1]
+        assert client.keys.count("limited") == 1, f"Keys used: {client.keys}"
+        assert client.keys.count("free") == 2
+        
+        print("  ✓ Rate limited requests retry on the next key")
+        return True
+    
+    def test_key_concurrency_limit(self):
+        """Test each key's semaphore bounds its concurrent calls"""
+        print("\n[TEST] Gemini key concurrency...")
+        
+        service = self._service("a,b", concurrency="1")
+        client = FakeGeminiClient({"a": 200, "b": 200})
+        
+        async def analyze_many():
+            return await asyncio.gather(*(
+                service._analyze(f"iVBORw0KGgoAAA{i:02d}", "png") for i in range(6)
+            ))
+        
+        self._run_with_client(client, analyze_many)
+        
+        assert client.keys.count("a") == client.keys.count("b") == 3
+        assert client.peak == {"a": 1, "b": 1}, f"Peak concurrency: {client.peak}"
+        
+        print("  ✓ Per-key concurrency is bounded")
+        return True
+    
+    def test_request_coalescing(self):
+        """Test concurrent calls for one image share a single analysis"""
+        print("\n[TEST] Gemini request coalescing...")
+        
+        service = self._service("key")
+        calls = []
+        
+        async def fake_analyze(image_base64, image_type):
+            calls.append(image_base64)
+            await asyncio.sleep(0.05)
+            if image_base64.endswith("fail"):
+                raise RuntimeError("API down")
+            return "result"
+        
+        service._analyze = fake_analyze
+        unhandled = []
+        
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            loop.set_exception_handler(lambda _, context: unhandled.append(context))
+            
+            # Two callers, one API call; cancelling one leaves the other
+            first = asyncio.ensure_future(service.analyze_floor_plan("iVBORw0KGgoshared"))
+            second = asyncio.ensure_future(service.analyze_floor_plan("iVBORw0KGgoshared"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            assert await second == "result"
+            assert first.cancelled()
+            assert calls == ["iVBORw0KGgoshared"], f"Analyses: {calls}"
+            
+            # The only caller leaves, then the shared task fails
+            waiter = asyncio.ensure_future(service.analyze_floor_plan("iVBORw0KGgofail"))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.sleep(0.1)
+            del waiter
+            gc.collect()
+            await asyncio.sleep(0)
+        
+        asyncio.run(scenario())
+        
+        messages = [context.get("message", "") for context in unhandled]
+        assert not messages, f"Unhandled task errors: {messages}"
+        assert service._in_flight == {}
+        
+        print("  ✓ Concurrent requests are coalesced safely")
+        return True
+
+
 def run_all_tests():
     """Run all validation tests"""
     print("=" * 60)
@@ -683,9 +1141,12 @@ def run_all_tests():
     
     preprocess_tests = TestPreprocessing()
     results.append(("Grayscale conversion", preprocess_tests.test_grayscale_conversion()))
+    results.append(("PIL grayscale conversion", preprocess_tests.test_pil_to_gray_matches_bgr_path()))
     results.append(("Noise reduction", preprocess_tests.test_noise_reduction()))
     results.append(("Contrast enhancement", preprocess_tests.test_contrast_enhancement()))
     results.append(("Full preprocessing", preprocess_tests.test_full_preprocessing_pipeline()))
+    results.append(("Skew detection accuracy", preprocess_tests.test_skew_detection_accuracy()))
+    results.append(("Degenerate image sizes", preprocess_tests.test_degenerate_image_sizes()))
     
     # Wall detection tests
     print("\n" + "=" * 40)
@@ -697,6 +1158,7 @@ def run_all_tests():
     results.append(("Wall classification", wall_tests.test_wall_classification()))
     results.append(("Wall thickness", wall_tests.test_wall_thickness_estimation()))
     results.append(("Multi-room walls", wall_tests.test_multi_room_wall_detection()))
+    results.append(("Batched wall serialization", wall_tests.test_walls_as_dicts()))
     
     # Room detection tests
     print("\n" + "=" * 40)
@@ -726,10 +1188,41 @@ def run_all_tests():
     
     ocr_tests = TestOCR()
     results.append(("Room type inference", ocr_tests.test_room_type_inference()))
+    results.append(("Keyword classification table", ocr_tests.test_keyword_classification_table()))
     results.append(("Label association", ocr_tests.test_label_association()))
+    results.append(("Label batch association", ocr_tests.test_label_batch_association()))
+    if ocr_service.linear_sum_assignment is not None:
+        results.append(("Nested room association", ocr_tests.test_nested_room_association()))
     results.append(("Default name assignment", ocr_tests.test_default_name_assignment()))
     results.append(("OCR result serialization", ocr_tests.test_ocr_result_serialization()))
     
+    # Image service tests
+    print("\n" + "=" * 40)
+    print("IMAGE SERVICE TESTS")
+    print("=" * 40)
+    
+    image_tests = TestImageService()
+    results.append(("Decode cache byte budget", image_tests.test_decode_cache_byte_budget()))
+    results.append(("Header probe", image_tests.test_header_probe()))
+    
+    # Response parsing tests
+    print("\n" + "=" * 40)
+    print("RESPONSE PARSING TESTS")
+    print("=" * 40)
+    
+    parsing_tests = TestResponseParsing()
+    results.append(("JSON extraction", parsing_tests.test_extract_json_text()))
+    
+    # Gemini service tests
+    print("\n" + "=" * 40)
+    print("GEMINI SERVICE TESTS")
+    print("=" * 40)
+    
+    gemini_tests = TestGeminiService()
+    results.append(("Gemini key rotation", gemini_tests.test_rate_limit_retry_uses_next_key()))
+    results.append(("Gemini key concurrency", gemini_tests.test_key_concurrency_limit()))
+    results.append(("Gemini request coalescing", gemini_tests.test_request_coalescing()))
+    
     # Summary
     print("\n" + "=" * 60)
     print("TEST SUMMARY")